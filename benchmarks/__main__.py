@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Benchmarks for both games. Each project runs in its own process, with its
+# directory on sys.path and SDL's dummy video driver for the render cases.
+#
+#   python -m benchmarks --save before.json
+#   python -m benchmarks --compare before.json --threshold 0.1
+#
+# --compare exits with status 1 when a case got slower than the threshold.
+
+ROOT = Path(__file__).resolve().parent.parent
+PROJECTS = {
+    "tetris-claude-sonnet-4": "benchmarks.claude",
+    "tetris-gemini-pro-25": "benchmarks.gemini",
+}
+
+
+def run_project(project, module, scale):
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT / project),
+        SDL_VIDEODRIVER="dummy",
+        SDL_AUDIODRIVER="dummy",
+        PYGAME_HIDE_SUPPORT_PROMPT="1",
+    )
+    print(project, file=sys.stderr)
+    output = subprocess.run(
+        [sys.executable, "-m", module, str(scale)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def compare(results, baseline, threshold):
+    # Prints per-case ratios, returns the names that regressed
+    regressions = []
+    print(f"{'':<42} {'baseline':>12} {'now':>12}  ratio")
+    for project, cases in results.items():
+        for name, ns in cases.items():
+            old = baseline.get(project, {}).get(name)
+            if old is None:
+                continue
+            ratio = ns / old
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{project}: {name}")
+            label = f"{project}: {name}"
+            print(f"{label:<42} {old:12,.0f} {ns:12,.0f}  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tetris benchmarks")
+    parser.add_argument("--save", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="baseline JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="slowdown ratio that counts as a regression (default 0.10)",
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiplies iteration counts"
+    )
+    parser.add_argument("--project", choices=sorted(PROJECTS), action="append")
+    args = parser.parse_args()
+
+    results = {
+        project: run_project(project, PROJECTS[project], args.scale)
+        for project in args.project or PROJECTS
+    }
+
+    if args.save:
+        data = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "scale": args.scale,
+            "results": results,
+        }
+        Path(args.save).write_text(json.dumps(data, indent=2) + "\n")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import importlib.util
+import random
+import sys
+import timeit
+from pathlib import Path
+
+# Compares the list-of-lists grid loops both games started with against the
+# bitboard backends. Run with: python benchmarks/bench_board.py
+
+ROOT = Path(__file__).resolve().parent.parent
+WIDTH = 10
+HEIGHT = 20
+BLACK = (0, 0, 0)
+T_TEMPLATE = ["...", "TTT", ".T."]  # Claude string art
+
+
+def load(project, name):
+    # Both projects have a board module, so the project's own modules are
+    # imported fresh and dropped from sys.modules again afterwards
+    local = {path.stem for path in (ROOT / project).glob("*.py")}
+    saved = {stem: sys.modules.pop(stem) for stem in local & set(sys.modules)}
+    sys.path.insert(0, str(ROOT / project))
+    try:
+        spec = importlib.util.spec_from_file_location(
+            f"{project}.{name}", ROOT / project / f"{name}.py"
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.pop(0)
+        for stem in local:
+            sys.modules.pop(stem, None)
+        sys.modules.update(saved)
+    return module
+
+
+def random_rows(seed=0):
+    # Bottom half ~70% full, plus two full rows
+    rng = random.Random(seed)
+    rows = [[False] * WIDTH for _ in range(HEIGHT)]
+    for y in range(HEIGHT // 2, HEIGHT):
+        for x in range(WIDTH):
+            rows[y][x] = rng.random() < 0.7
+    rows[HEIGHT - 1] = rows[HEIGHT - 3] = [True] * WIDTH
+    return rows
+
+
+# --- Legacy implementations, as they were in the games ---
+def claude_check_collision(grid, template, pos_x, pos_y):
+    for y, row in enumerate(template):
+        for x, cell in enumerate(row):
+            if cell != ".":
+                new_x = pos_x + x
+                new_y = pos_y + y
+                if (
+                    new_x < 0
+                    or new_x >= WIDTH
+                    or new_y >= HEIGHT
+                    or (new_y >= 0 and grid[new_y][new_x] != 0)
+                ):
+                    return True
+    return False
+
+
+def claude_full_rows(grid):
+    return [y for y in range(HEIGHT) if all(cell != 0 for cell in grid[y])]
+
+
+def gemini_is_valid_position(grid, shape_coords, piece_x, piece_y):
+    for r_offset, c_offset in shape_coords:
+        r_world, c_world = piece_y + r_offset, piece_x + c_offset
+        if not (0 <= c_world < WIDTH):
+            return False
+        if r_world >= HEIGHT:
+            return False
+        if r_world >= 0 and grid[r_world][c_world] != BLACK:
+            return False
+    return True
+
+
+def gemini_full_rows(grid):
+    full = []
+    for r in range(HEIGHT - 1, -1, -1):
+        is_full = True
+        for c in range(WIDTH):
+            if grid[r][c] == BLACK:
+                is_full = False
+                break
+        if is_full:
+            full.append(r)
+    return full
+
+
+def time_ns(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def bench_claude(rows):
+    engine = load("tetris-claude-sonnet-4", "engine")
+    grid = [["T" if cell else 0 for cell in row] for row in rows]
+    board = engine.BitBoard(WIDTH, HEIGHT)
+    for y, row in enumerate(rows):
+        board.place([(x, y) for x, cell in enumerate(row) if cell], 1)
+    index = engine.PIECES["T"].index(T_TEMPLATE)
+
+    def legacy_ghost():
+        y = 0
+        while not claude_check_collision(grid, T_TEMPLATE, 4, y + 1):
+            y += 1
+        return y
+
+    def bitboard_ghost():
+        y = 0
+        while not board.collides(engine.SHAPES["T"][index].bits, 4, y + 1):
+            y += 1
+        return y
+
+    return [
+        (
+            "collision",
+            lambda: claude_check_collision(grid, T_TEMPLATE, 4, 5),
+            lambda: board.collides(engine.SHAPES["T"][index].bits, 4, 5),
+        ),
+        ("ghost drop", legacy_ghost, bitboard_ghost),
+        ("full rows", lambda: claude_full_rows(grid), board.full_rows),
+    ]
+
+
+def bench_gemini(rows):
+    # The game's own functions, so piece bits are the precomputed ones
+    tetris = load("tetris-gemini-pro-25", "tetris")
+    grid = [[(0, 220, 0) if cell else BLACK for cell in row] for row in rows]
+    board = tetris.create_grid()
+    for r, row in enumerate(rows):
+        board.place([(r, c) for c, cell in enumerate(row) if cell], 1)
+    piece = tetris.Piece(5, 1, "T")
+    coords = list(piece.current_shape_coords)
+
+    def legacy_ghost():
+        y = 1
+        while gemini_is_valid_position(grid, coords, 5, y + 1):
+            y += 1
+        return y
+
+    return [
+        (
+            "collision",
+            lambda: gemini_is_valid_position(grid, coords, 5, 6),
+            lambda: piece.is_valid_position(5, 6, board),
+        ),
+        ("ghost drop", legacy_ghost, lambda: 1 + tetris.drop_distance(piece, board)),
+        ("full rows", lambda: gemini_full_rows(grid), board.full_rows),
+    ]
+
+
+def main():
+    rows = random_rows()
+    for project, cases in [
+        ("tetris-claude-sonnet-4", bench_claude(rows)),
+        ("tetris-gemini-pro-25", bench_gemini(rows)),
+    ]:
+        print(project)
+        for name, legacy, bitboard in cases:
+            assert (
+                sorted(legacy()) == sorted(bitboard())
+                if name == "full rows"
+                else (legacy() == bitboard())
+            )
+            old_ns = time_ns(legacy, 20_000)
+            new_ns = time_ns(bitboard, 20_000)
+            print(
+                f"  {name:<12} list {old_ns:8.0f} ns  bitboard {new_ns:8.0f} ns"
+                f"  x{old_ns / new_ns:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
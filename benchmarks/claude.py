@@ -0,0 +1,134 @@
+import copy
+import random
+
+from benchmarks.common import (
+    HEIGHT,
+    random_rows,
+    report,
+    scale_from_argv,
+    time_call,
+    time_each,
+)
+from engine import ACTIONS, DROP, PIECE_IDS, TetrisEngine
+
+# tetris-claude-sonnet-4 micro-paths, rendering and headless throughput.
+# Run through `python -m benchmarks`, which puts the project on sys.path.
+
+
+def crafted_engine(piece="T"):
+    # Random bottom half with two full rows, piece hovering above it
+    engine = TetrisEngine(seed=0)
+    for y, row in enumerate(random_rows()):
+        engine.board.place([(x, y) for x, cell in enumerate(row) if cell], 1)
+    engine.current_piece = piece
+    engine.current_pos = [4, 2]
+    engine.current_rotation = 0
+    return engine
+
+
+def locking_engine():
+    # T resting on the crafted stack, so placing it locks without clears
+    engine = crafted_engine()
+    engine.board.clear_rows(engine.board.full_rows())
+    engine.current_pos[1] += engine.drop_distance()
+    return engine
+
+
+def play_games(games, policy):
+    steps = 0
+    for seed in range(games):
+        engine = TetrisEngine(seed=seed)
+        rng = random.Random(seed)
+        while engine.step(policy(rng)):
+            steps += 1
+    return steps
+
+
+def bench_collision(scale):
+    engine = crafted_engine()
+    return time_call(engine.check_collision, int(200_000 * scale))
+
+
+def bench_check_lines(scale):
+    engine = crafted_engine()
+    return time_each(
+        lambda: copy.deepcopy(engine), TetrisEngine.check_lines, int(2_000 * scale)
+    )
+
+
+def bench_place_piece(scale):
+    engine = locking_engine()
+    return time_each(
+        lambda: copy.deepcopy(engine), TetrisEngine.place_piece, int(2_000 * scale)
+    )
+
+
+def bench_ghost(scale):
+    engine = crafted_engine()
+    return time_call(engine.get_ghost_position, int(200_000 * scale))
+
+
+def bench_drop_distance(scale):
+    engine = crafted_engine()
+    return time_call(engine.drop_distance, int(100_000 * scale))
+
+
+def game_case(policy, games):
+    # ns per engine step over a fixed set of seeded games
+    def case(scale):
+        count = max(1, int(games * scale))
+        steps = play_games(count, policy)
+        return time_call(lambda: play_games(count, policy), 1) / steps
+
+    return case
+
+
+def render_game():
+    import tetris
+
+    game = tetris.TetrisGame(seed=0)
+    for y, row in enumerate(random_rows()):
+        if y != HEIGHT - 1 and y != HEIGHT - 3:
+            cells = [(x, y) for x, cell in enumerate(row) if cell]
+            game.board.place(cells, PIECE_IDS["T"])
+    game.render()
+    return game
+
+
+def bench_render_full(scale):
+    # Frame after a lock: static layer rebuilt, whole window updated
+    game = render_game()
+
+    def frame():
+        game.static_dirty = True
+        game.render()
+
+    return time_call(frame, int(200 * scale))
+
+
+def bench_render_frame(scale):
+    # Steady-state frame: only the piece, ghost and particles are redrawn
+    game = render_game()
+
+    def frame():
+        game.scene = None  # As if the piece had moved
+        game.render()
+
+    return time_call(frame, int(2_000 * scale))
+
+
+CASES = {
+    "check_collision": bench_collision,
+    "check_lines": bench_check_lines,
+    "place_piece": bench_place_piece,
+    "get_ghost_position": bench_ghost,
+    "drop_distance": bench_drop_distance,
+    "render full frame": bench_render_full,
+    "render dirty frame": bench_render_frame,
+    "game step (random)": game_case(lambda rng: rng.choice(ACTIONS), 20),
+    "game step (drop)": game_case(lambda rng: DROP, 200),
+}
+
+
+if __name__ == "__main__":
+    report(CASES, scale_from_argv())
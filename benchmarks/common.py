@@ -0,0 +1,61 @@
+import json
+import random
+import sys
+import time
+
+# Shared helpers for the per-project benchmark modules. Each one runs in its
+# own process with its project directory on sys.path (both projects have
+# modules called board, tetris and replay) and prints its results as JSON.
+
+WIDTH = 10
+HEIGHT = 20
+REPEAT = 5
+
+
+def random_rows(seed=0):
+    # Bottom half ~70% full, plus two full rows
+    rng = random.Random(seed)
+    rows = [[False] * WIDTH for _ in range(HEIGHT)]
+    for y in range(HEIGHT // 2, HEIGHT):
+        for x in range(WIDTH):
+            rows[y][x] = rng.random() < 0.7
+    rows[HEIGHT - 1] = rows[HEIGHT - 3] = [True] * WIDTH
+    return rows
+
+
+def time_call(func, number):
+    # Best-of-REPEAT nanoseconds per call
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / number * 1e9
+
+
+def time_each(setup, func, number):
+    # Like time_call for functions that consume their state: func(state) is
+    # timed on fresh setup() results, setup itself is not timed
+    best = float("inf")
+    for _ in range(REPEAT):
+        states = [setup() for _ in range(number)]
+        start = time.perf_counter()
+        for state in states:
+            func(state)
+        best = min(best, time.perf_counter() - start)
+    return best / number * 1e9
+
+
+def report(cases, scale):
+    # cases: name -> callable(number) returning ns per operation. Prints
+    # {name: ns} as JSON on stdout for benchmarks/__main__.py to collect.
+    results = {}
+    for name, case in cases.items():
+        results[name] = case(scale)
+        print(f"  {name:<24} {results[name]:12,.0f} ns", file=sys.stderr)
+    json.dump(results, sys.stdout)
+
+
+def scale_from_argv():
+    return float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
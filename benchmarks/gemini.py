@@ -0,0 +1,166 @@
+import random
+
+import pygame
+
+import tetris
+from benchmarks.common import (
+    HEIGHT,
+    random_rows,
+    report,
+    scale_from_argv,
+    time_call,
+    time_each,
+)
+
+# tetris-gemini-pro-25 micro-paths, rendering and headless throughput.
+# Run through `python -m benchmarks`, which puts the project on sys.path.
+
+
+def crafted_grid(full_rows=True):
+    # Random bottom half, with or without its two full rows
+    grid = tetris.create_grid()
+    for r, row in enumerate(random_rows()):
+        if full_rows or (r != HEIGHT - 1 and r != HEIGHT - 3):
+            grid.place([(r, c) for c, cell in enumerate(row) if cell], 1)
+    return grid
+
+
+def crafted_piece():
+    return tetris.Piece(x=5, y=3, shape_name="T")
+
+
+def play_games(games):
+    # Hard-drop-only games through the game's own functions; returns pieces
+    pieces = 0
+    for seed in range(games):
+        rng = random.Random(seed)
+        grid = tetris.create_grid()
+        while True:
+            piece = tetris.new_piece(rng)
+            if not piece.is_valid_position(piece.x, piece.y, grid):
+                break
+            piece.y += tetris.drop_distance(piece, grid)
+            tetris.lock_piece(grid, piece)
+            tetris.clear_lines(grid)
+            pieces += 1
+    return pieces
+
+
+def bench_is_valid_position(scale):
+    grid = crafted_grid()
+    piece = crafted_piece()
+    return time_call(
+        lambda: piece.is_valid_position(piece.x, piece.y, grid),
+        int(200_000 * scale),
+    )
+
+
+def bench_clear_lines(scale):
+    grid = crafted_grid()
+    return time_each(grid.copy, tetris.clear_lines, int(2_000 * scale))
+
+
+def bench_lock_piece(scale):
+    grid = crafted_grid(full_rows=False)
+    piece = crafted_piece()
+    piece.y += tetris.drop_distance(piece, grid)
+    return time_each(
+        grid.copy,
+        lambda grid: tetris.lock_piece(grid, piece),
+        int(2_000 * scale),
+    )
+
+
+def bench_ghost(scale):
+    grid = crafted_grid()
+    piece = crafted_piece()
+    return time_call(lambda: tetris.ghost_row(piece, grid), int(200_000 * scale))
+
+
+def bench_drop_distance(scale):
+    grid = crafted_grid()
+    piece = crafted_piece()
+    return time_call(lambda: tetris.drop_distance(piece, grid), int(100_000 * scale))
+
+
+def bench_snapshot(scale):
+    # Rollback as a lookahead bot would do it: restore, then try a move
+    state = tetris.GameState(random.Random(0))
+    for _ in range(10):
+        state.apply("drop")
+    snapshot = state.snapshot()
+
+    def branch():
+        state.restore(snapshot)
+        state.apply("drop")
+
+    return time_call(branch, int(20_000 * scale))
+
+
+def bench_game(scale):
+    # ns per piece
+    games = max(1, int(200 * scale))
+    pieces = play_games(games)
+    return time_call(lambda: play_games(games), 1) / pieces
+
+
+def render_setup():
+    pygame.init()
+    screen = pygame.display.set_mode((tetris.SCREEN_WIDTH, tetris.SCREEN_HEIGHT))
+    background = pygame.Surface((tetris.SCREEN_WIDTH, tetris.SCREEN_HEIGHT))
+    background.fill(tetris.BG_COLOR)
+    tetris.draw_grid_lines(background)
+    static = background.copy()
+    grid = crafted_grid(full_rows=False)
+    tetris.draw_static(static, background, grid, 1234, crafted_piece())
+    return screen, background, static, grid
+
+
+def bench_render_full(scale):
+    # Frame after a lock, as main() draws it: static layer rebuilt and flipped
+    screen, background, static, grid = render_setup()
+    piece = crafted_piece()
+
+    def frame():
+        tetris.draw_static(static, background, grid, 1234, piece)
+        screen.blit(static, (0, 0))
+        tetris.draw_ghost_piece(screen, piece, grid)
+        tetris.draw_piece(screen, piece)
+        pygame.display.flip()
+
+    return time_call(frame, int(200 * scale))
+
+
+def bench_render_frame(scale):
+    # Steady-state frame: restore and redraw the piece and ghost cells only
+    screen, background, static, grid = render_setup()
+    piece = crafted_piece()
+    dirty_rects = []
+
+    def frame():
+        nonlocal dirty_rects
+        for rect in dirty_rects:
+            screen.blit(static, rect, rect)
+        rects = tetris.draw_ghost_piece(screen, piece, grid)
+        rects += tetris.draw_piece(screen, piece)
+        pygame.display.update(rects + dirty_rects)
+        dirty_rects = rects
+
+    return time_call(frame, int(2_000 * scale))
+
+
+CASES = {
+    "is_valid_position": bench_is_valid_position,
+    "clear_lines": bench_clear_lines,
+    "lock_piece": bench_lock_piece,
+    "ghost_row": bench_ghost,
+    "drop_distance": bench_drop_distance,
+    "state restore + drop": bench_snapshot,
+    "render full frame": bench_render_full,
+    "render dirty frame": bench_render_frame,
+    "game piece (drop)": bench_game,
+}
+
+
+if __name__ == "__main__":
+    report(CASES, scale_from_argv())
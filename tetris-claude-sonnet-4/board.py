@@ -0,0 +1,186 @@
+import random
+from functools import lru_cache
+
+# Bitboard backend: bit x of row y's mask is set when cell (x, y) is
+# occupied. Piece ids for rendering live in a separate bytearray plane.
+#
+# Collision tests use one packed integer holding every row. Each packed row
+# is GUARD wall bits followed by the row's cells, there are TOP empty rows
+# above the board for pieces poking out of it and FLOOR solid rows below.
+# Pieces are packed the same way, so a collision test is one shift and AND.
+#
+# Boards also keep a Zobrist key of their occupancy for transposition
+# tables: the XOR of a random 64-bit key per (row, row mask), 0 for empty
+# rows. Placing cells XORs the changed rows' old and new keys, and clearing
+# lines redoes only the rows that moved, from the top of the stack down.
+
+GUARD = 3
+TOP = 4
+FLOOR = 4
+
+
+def zobrist_keys(name, states):
+    # state -> random 64-bit key. Seeded by name, so keys are the same in
+    # every run and tables with different names don't share keys.
+    rng = random.Random(f"zobrist {name}")
+    return {state: rng.getrandbits(64) for state in states}
+
+
+@lru_cache(maxsize=None)
+def row_keys(width, height):
+    # row_keys(...)[row][mask], the key of an empty row is 0
+    rng = random.Random(f"zobrist rows {width}x{height}")
+    return tuple(
+        (0,) + tuple(rng.getrandbits(64) for _ in range(1, 1 << width))
+        for _ in range(height)
+    )
+
+
+def pack_masks(masks, width):
+    # Piece row masks (top row first, bit 0 at the piece's x) -> packed bits
+    stride = width + GUARD
+    return sum(mask << (dy * stride) for dy, mask in enumerate(masks))
+
+
+class BitBoard:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.full_mask = (1 << width) - 1
+        # Row data lives in slots: masks[s] and the width-byte run of cells
+        # at s * width. order[y] is the slot showing row y, so collapsing
+        # cleared rows moves slot numbers and never copies cells.
+        self.order = list(range(height))
+        self.masks = [0] * height
+        self.cells = bytearray(width * height)
+        # Rows that filled up since the last clear
+        self.filled = set()
+        # Stack height per column: height minus its topmost occupied row
+        self.heights = [0] * width
+        # Zobrist key of the occupied cells
+        self.row_keys = row_keys(width, height)
+        self.key = 0
+
+        self.stride = width + GUARD
+        wall = (1 << GUARD) - 1
+        self.walls = sum(
+            wall << (r * self.stride) for r in range(TOP + height + FLOOR)
+        ) | (((1 << (FLOOR * self.stride)) - 1) << ((TOP + height) * self.stride))
+        self.bits = self.walls
+
+    @property
+    def rows(self):
+        # Row masks top to bottom, built on demand
+        return [self.masks[slot] for slot in self.order]
+
+    def collides(self, piece_bits, x, y):
+        # piece_bits come from pack_masks(); y must not be above -TOP
+        return self.bits & (piece_bits << ((y + TOP) * self.stride + GUARD + x)) != 0
+
+    def place(self, cells, piece_id):
+        for x, y in cells:
+            slot = self.order[y]
+            old = self.masks[slot]
+            mask = self.masks[slot] = old | 1 << x
+            keys = self.row_keys[y]
+            self.key ^= keys[old] ^ keys[mask]
+            self.cells[slot * self.width + x] = piece_id
+            self.bits |= 1 << ((y + TOP) * self.stride + GUARD + x)
+            self.heights[x] = max(self.heights[x], self.height - y)
+            if mask == self.full_mask:
+                self.filled.add(y)
+
+    def get(self, x, y):
+        return self.cells[self.order[y] * self.width + x]
+
+    def row_cells(self, y):
+        start = self.order[y] * self.width
+        return self.cells[start : start + self.width]
+
+    def tobytes(self):
+        # One piece id byte per cell, row by row from the top
+        width = self.width
+        return b"".join(
+            self.cells[slot * width : (slot + 1) * width] for slot in self.order
+        )
+
+    def full_rows(self):
+        return sorted(self.filled)
+
+    def clear_rows(self, lines):
+        # Costs the cleared rows plus a pointer move per row above them; the
+        # rows below the lowest cleared one are not touched
+        lines = sorted(lines)
+        width, stride = self.width, self.stride
+        top, bottom = lines[0], lines[-1]
+
+        # Rows above the stack are empty before and after, and keep key 0.
+        # The rest are keyed out here and back in where they land.
+        keys, masks, order = self.row_keys, self.masks, self.order
+        moved = range(self.height - max(self.heights), bottom + 1)
+        key = self.key
+        for y in moved:
+            key ^= keys[y][masks[order[y]]]
+
+        # Blank the cleared slots and move them to the top, shifting the
+        # rows above each one down
+        cleared = set(lines)
+        slots = [self.order[y] for y in lines]
+        for slot in slots:
+            self.masks[slot] = 0
+            self.cells[slot * width : (slot + 1) * width] = bytes(width)
+        self.order[: bottom + 1] = slots + [
+            slot for y, slot in enumerate(self.order[: bottom + 1]) if y not in cleared
+        ]
+        self.filled = {
+            y + sum(line > y for line in lines) for y in self.filled if y not in cleared
+        }
+        for y in moved:
+            key ^= keys[y][masks[order[y]]]
+        self.key = key
+
+        # Same collapse on the packed bits: everything above a cleared row
+        # moves one row down. Clearing top-down keeps indices valid.
+        occupied = self.bits ^ self.walls
+        for y in lines:
+            cut = (y + TOP) * stride
+            above = occupied & ((1 << cut) - 1)
+            occupied = occupied >> (cut + stride) << (cut + stride) | above << stride
+        self.bits = occupied | self.walls
+
+        # Cleared rows are full, so every column reaches the top one. Columns
+        # topping out above it just lose the cleared rows; those that top out
+        # on it drop to their next occupied cell further down.
+        count = len(lines)
+        pending = 0
+        for x, h in enumerate(self.heights):
+            if h > self.height - top:
+                self.heights[x] = h - count
+            else:
+                pending |= 1 << x
+        for y in range(top + count, self.height):
+            if not pending:
+                break
+            tops = self.masks[self.order[y]] & pending
+            pending &= ~tops
+            while tops:
+                bit = tops & -tops
+                self.heights[bit.bit_length() - 1] = self.height - y
+                tops ^= bit
+        while pending:
+            bit = pending & -pending
+            self.heights[bit.bit_length() - 1] = 0
+            pending ^= bit
+
+    def drop_distance(self, bottom, x, y):
+        # Rows a piece at (x, y) can fall, from its bottom profile ((column
+        # offset, lowest row offset) pairs, see Shape.bottom) and the column
+        # heights. None when the piece is below the surface of a column it
+        # covers (slid under an overhang); the caller has to search then.
+        distance = self.height
+        for dx, dy in bottom:
+            gap = self.height - self.heights[x + dx] - 1 - (y + dy)
+            if gap < 0:
+                return None
+            distance = min(distance, gap)
+        return distance
@@ -0,0 +1,282 @@
+import random
+from collections import namedtuple
+
+from board import BitBoard, pack_masks, zobrist_keys
+
+# Pure game logic, no pygame. The pygame frontend in tetris.py is a thin
+# renderer on top of TetrisEngine; headless tools drive it through step().
+
+GRID_WIDTH = 10
+GRID_HEIGHT = 20
+
+# Tetris pieces
+PIECES = {
+    "I": [["....", "IIII", "....", "...."], [".I..", ".I..", ".I..", ".I.."]],
+    "O": [["OO", "OO"]],
+    "T": [
+        ["...", "TTT", ".T."],
+        [".T.", "TT.", ".T."],
+        [".T.", "TTT", "..."],
+        [".T.", ".TT", ".T."],
+    ],
+    "S": [["...", ".SS", "SS."], ["S..", "SS.", ".S."]],
+    "Z": [["...", "ZZ.", ".ZZ"], [".Z.", "ZZ.", "Z.."]],
+    "J": [
+        ["...", "JJJ", "..J"],
+        ["JJ.", "J..", "J.."],
+        ["J..", "JJJ", "..."],
+        [".J.", ".J.", "JJ."],
+    ],
+    "L": [
+        ["...", "LLL", "L.."],
+        [".L.", ".L.", "LL."],
+        ["..L", "LLL", "..."],
+        ["LL.", ".L.", ".L."],
+    ],
+}
+
+PIECE_TYPES = list(PIECES)
+# Board cells store 1-based piece ids, 0 is empty
+PIECE_IDS = {piece: i + 1 for i, piece in enumerate(PIECE_TYPES)}
+
+# Score based on number of lines cleared simultaneously
+LINE_SCORES = [0, 100, 300, 500, 800]
+
+# Actions accepted by TetrisEngine.step()
+NOOP = 0
+LEFT = 1
+RIGHT = 2
+ROTATE_CW = 3
+ROTATE_CCW = 4
+DOWN = 5  # One gravity step, locks the piece if it can't fall any further
+DROP = 6  # Hard drop
+ACTIONS = (NOOP, LEFT, RIGHT, ROTATE_CW, ROTATE_CCW, DOWN, DROP)
+
+
+# Compiled piece template: cells are (x, y) offsets from the template's top
+# left, bbox is (min_x, min_y, max_x, max_y), bottom maps each occupied column
+# offset to its lowest cell, masks are per-row bitmasks and bits is the packed
+# form BitBoard.collides() takes
+Shape = namedtuple("Shape", "cells bbox bottom masks bits")
+
+
+def compile_shape(template):
+    cells = tuple(
+        (x, y)
+        for y, row in enumerate(template)
+        for x, cell in enumerate(row)
+        if cell != "."
+    )
+    xs = [x for x, y in cells]
+    ys = [y for x, y in cells]
+    bottom = {}
+    for x, y in cells:
+        bottom[x] = max(bottom.get(x, y), y)
+    masks = tuple(
+        sum(1 << x for x, cell in enumerate(row) if cell != ".") for row in template
+    )
+    return Shape(
+        cells,
+        (min(xs), min(ys), max(xs), max(ys)),
+        tuple(sorted(bottom.items())),
+        masks,
+        pack_masks(masks, GRID_WIDTH),
+    )
+
+
+# SHAPES[piece][rotation & 3], pieces with fewer than four templates repeat
+# them so the rotation index never needs a modulo
+SHAPES = {
+    piece: tuple(
+        compile_shape(rotations[rotation % len(rotations)]) for rotation in range(4)
+    )
+    for piece, rotations in PIECES.items()
+}
+ROTATIONS = {piece: len(rotations) for piece, rotations in PIECES.items()}
+
+# Zobrist keys for position_key(): the falling piece's state, with room for
+# positions poking past the edges, and the preview piece
+PIECE_KEYS = zobrist_keys(
+    "piece",
+    (
+        (piece, rotation, x, y)
+        for piece in PIECE_TYPES
+        for rotation in range(4)
+        for x in range(-4, GRID_WIDTH + 4)
+        for y in range(-4, GRID_HEIGHT + 4)
+    ),
+)
+NEXT_KEYS = zobrist_keys("next", PIECE_TYPES)
+
+
+class TetrisEngine:
+    def __init__(self, seed=None):
+        # Own generator so games can be reproduced from their seed
+        self.random = random.Random(seed)
+        self.board = BitBoard(GRID_WIDTH, GRID_HEIGHT)
+        self.current_piece = None
+        self.next_piece = None
+        self.current_pos = [0, 0]
+        self.current_rotation = 0
+        self.score = 0
+        self.level = 1
+        self.lines_cleared = 0
+        self.pieces_placed = 0
+        self.fall_speed = 500  # milliseconds
+        self.over = False
+        self._ghost = (None, 0)  # (piece state and board, ghost row)
+
+        self.spawn_piece()
+
+    @property
+    def grid(self):
+        # List-of-lists view (0 or piece letter per cell), built on demand
+        return [
+            [PIECE_TYPES[i - 1] if i else 0 for i in self.board.row_cells(y)]
+            for y in range(GRID_HEIGHT)
+        ]
+
+    def spawn_piece(self):
+        # Pieces are drawn one ahead so next_piece can be previewed; the
+        # sequence is the same as drawing each one when it spawns
+        if self.next_piece is None:
+            self.next_piece = self.random.choice(PIECE_TYPES)
+        self.current_piece = self.next_piece
+        self.next_piece = self.random.choice(PIECE_TYPES)
+        self.current_pos = [GRID_WIDTH // 2 - 1, 0]
+        self.current_rotation = 0
+
+        # Check game over
+        if self.check_collision():
+            return self.game_over()
+        return True
+
+    def game_over(self):
+        # Frontends override this to show a game over screen; returning True
+        # from there means the game was restarted
+        self.over = True
+        return False
+
+    def position_key(self):
+        # 64-bit key of the board, falling piece and preview for
+        # transposition tables. The board keeps its part up to date itself.
+        x, y = self.current_pos
+        return (
+            self.board.key
+            ^ PIECE_KEYS[self.current_piece, self.current_rotation & 3, x, y]
+            ^ NEXT_KEYS[self.next_piece]
+        )
+
+    def get_shape(self, rotation=0):
+        return SHAPES[self.current_piece][(self.current_rotation + rotation) & 3]
+
+    def check_collision(self, dx=0, dy=0, rotation=0):
+        return self.board.collides(
+            SHAPES[self.current_piece][(self.current_rotation + rotation) & 3].bits,
+            self.current_pos[0] + dx,
+            self.current_pos[1] + dy,
+        )
+
+    def place_piece(self):
+        pos_x, pos_y = self.current_pos
+        placed = [
+            (pos_x + x, pos_y + y)
+            for x, y in self.get_shape().cells
+            if 0 <= pos_y + y < GRID_HEIGHT
+        ]
+        self.board.place(placed, PIECE_IDS[self.current_piece])
+        self.pieces_placed += 1
+        self.on_piece_placed(placed)
+
+        self.check_lines()
+        if not self.spawn_piece():
+            return False
+        return True
+
+    def on_piece_placed(self, cells):
+        # Hook for frontends, called with the (x, y) cells of a locked piece
+        pass
+
+    def check_lines(self):
+        lines_to_clear = self.board.full_rows()
+
+        if lines_to_clear:
+            self.on_lines_cleared(lines_to_clear)
+
+            # Clear lines and update score
+            self.board.clear_rows(lines_to_clear)
+
+            lines_count = len(lines_to_clear)
+            self.lines_cleared += lines_count
+            score_multiplier = LINE_SCORES[min(lines_count, 4)]
+            self.score += score_multiplier * (self.level + 1)
+            self.level = self.lines_cleared // 10 + 1
+            self.fall_speed = max(50, 500 - (self.level - 1) * 50)
+        return len(lines_to_clear)
+
+    def on_lines_cleared(self, lines):
+        # Hook for frontends, called with the full rows before they are removed
+        pass
+
+    def move_piece(self, dx, dy):
+        if not self.check_collision(dx, dy):
+            self.current_pos[0] += dx
+            self.current_pos[1] += dy
+            return True
+        return False
+
+    def rotate_piece(self, direction):
+        rotations = ROTATIONS.get(self.current_piece, 0)
+        if rotations > 1:
+            if not self.check_collision(rotation=direction):
+                self.current_rotation = (self.current_rotation + direction) % rotations
+                return True
+        return False
+
+    def drop_distance(self):
+        # The column heights answer this directly unless the piece has been
+        # slid under an overhang
+        distance = self.board.drop_distance(
+            self.get_shape().bottom, self.current_pos[0], self.current_pos[1]
+        )
+        if distance is None:
+            distance = 0
+            while not self.check_collision(0, distance + 1):
+                distance += 1
+        return distance
+
+    def drop_piece(self):
+        self.current_pos[1] += self.drop_distance()
+        return self.place_piece()
+
+    def get_ghost_position(self):
+        # Cached until the piece moves or the board changes
+        key = (
+            self.current_piece,
+            self.current_rotation,
+            self.current_pos[0],
+            self.current_pos[1],
+            self.board.bits,
+        )
+        if self._ghost[0] != key:
+            self._ghost = (key, self.current_pos[1] + self.drop_distance())
+        return self._ghost[1]
+
+    def step(self, action):
+        # Apply one action; returns False once the game is over
+        if self.over:
+            return False
+        if action == LEFT:
+            self.move_piece(-1, 0)
+        elif action == RIGHT:
+            self.move_piece(1, 0)
+        elif action == ROTATE_CW:
+            self.rotate_piece(1)
+        elif action == ROTATE_CCW:
+            self.rotate_piece(-1)
+        elif action == DOWN:
+            if not self.move_piece(0, 1):
+                return self.place_piece()
+        elif action == DROP:
+            return self.drop_piece()
+        return True
@@ -0,0 +1,59 @@
+import numpy as np
+import pygame
+
+from engine import GRID_HEIGHT, GRID_WIDTH, PIECE_IDS, PIECE_TYPES
+
+# Observations for training and data collection. Observer fills the same
+# arrays on every call straight from the board's cell buffer, so a step
+# costs no list building; pixels() hands out the rendered frame as a view
+# of the window surface instead of a saved screenshot.
+#
+#   observer = Observer()
+#   obs = observer.observe(game)        # dict of uint8 arrays
+#   game.render()
+#   frame = pixels(game.screen, 2)      # (width / 2, height / 2, 3) view
+#   del frame                           # unlocks the surface for drawing
+
+
+def cell_view(board):
+    # (height, width) uint8 view of the board's cell bytes, no copy. Rows
+    # are in slot order: row y is view[board.order[y]].
+    return np.frombuffer(board.cells, np.uint8).reshape(board.height, board.width)
+
+
+class Observer:
+    # The arrays are reused by every call; copy them to keep one
+    def __init__(self):
+        self.board = np.zeros((GRID_HEIGHT, GRID_WIDTH), np.uint8)  # Piece ids
+        self.active = np.zeros((GRID_HEIGHT, GRID_WIDTH), np.uint8)  # Falling piece
+        self.piece = np.zeros(len(PIECE_TYPES), np.uint8)  # One-hot
+        self.next = np.zeros(len(PIECE_TYPES), np.uint8)  # One-hot
+        self.arrays = {
+            "board": self.board,
+            "active": self.active,
+            "piece": self.piece,
+            "next": self.next,
+        }
+
+    def observe(self, engine):
+        board = engine.board
+        # One gather from the slot buffer puts the rows in board order
+        np.take(cell_view(board), board.order, axis=0, out=self.board)
+        self.active.fill(0)
+        self.piece.fill(0)
+        self.next.fill(0)
+        if not engine.over:
+            x, y = engine.current_pos
+            for dx, dy in engine.get_shape().cells:
+                if 0 <= y + dy < GRID_HEIGHT:
+                    self.active[y + dy, x + dx] = 1
+            self.piece[PIECE_IDS[engine.current_piece] - 1] = 1
+        self.next[PIECE_IDS[engine.next_piece] - 1] = 1
+        return self.arrays
+
+
+def pixels(surface, step=1):
+    # The frame as a (width, height, 3) uint8 view of surface, keeping every
+    # step-th pixel each way. The surface stays locked while the view is
+    # alive, so drop it before drawing again.
+    return pygame.surfarray.pixels3d(surface)[::step, ::step]
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Struct-of-arrays particle pool. Live particles occupy the first `count`
+# slots in spawn order (oldest first); dead ones are compacted out in bulk
+# after each update, and when the pool is full the oldest are recycled.
+# Velocities and life are in 60 Hz frames; update() takes the elapsed time
+# in those units so the simulation can tick at any rate.
+
+MAX_PARTICLES = 1024
+MAX_LIFE = 60  # Frames
+GRAVITY = 0.2
+MAX_SIZE = 4  # Radius in pixels at full life
+
+
+class ParticleSystem:
+    def __init__(self, capacity=MAX_PARTICLES, seed=None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity)
+        self.color = np.zeros(capacity, np.uint8)  # Index into the caller's palette
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, xs, ys, colors, per_point):
+        # Emits per_point particles at each (xs[i], ys[i]) with colors[i]
+        xs = np.repeat(np.asarray(xs, float), per_point)
+        ys = np.repeat(np.asarray(ys, float), per_point)
+        colors = np.repeat(np.asarray(colors, np.uint8), per_point)
+        n = min(len(xs), self.capacity)
+        if not n:
+            return
+        xs, ys, colors = xs[-n:], ys[-n:], colors[-n:]
+
+        # Recycle the oldest particles to make room
+        overflow = self.count + n - self.capacity
+        if overflow > 0:
+            self.keep(slice(overflow, self.count))
+
+        new = slice(self.count, self.count + n)
+        self.x[new] = xs
+        self.y[new] = ys
+        self.vx[new] = self.rng.uniform(-5, 5, n)
+        self.vy[new] = self.rng.uniform(-8, -2, n)
+        self.life[new] = MAX_LIFE
+        self.color[new] = colors
+        self.count += n
+
+    def keep(self, index):
+        # Moves the selected live particles to the front of the pool
+        for array in (self.x, self.y, self.vx, self.vy, self.life, self.color):
+            kept = array[: self.count][index]
+            array[: len(kept)] = kept
+        self.count = len(kept)
+
+    def update(self, dt=1.0):
+        live = slice(0, self.count)
+        self.x[live] += self.vx[live] * dt
+        self.y[live] += self.vy[live] * dt
+        self.vy[live] += GRAVITY * dt
+        self.life[live] -= dt
+        alive = self.life[live] > 0
+        if not alive.all():
+            self.keep(alive)
+
+    def visible(self, ahead=0.0):
+        # (x, y, radius, color) of every particle big enough to draw, with
+        # positions extrapolated `ahead` frames past the last update
+        live = slice(0, self.count)
+        size = (MAX_SIZE * self.life[live] / MAX_LIFE).astype(int)
+        shown = size > 0
+        x = self.x[live] + self.vx[live] * ahead
+        y = self.y[live] + self.vy[live] * ahead
+        return zip(
+            x[shown].astype(int).tolist(),
+            y[shown].astype(int).tolist(),
+            size[shown].tolist(),
+            self.color[live][shown].tolist(),
+        )
@@ -0,0 +1,32 @@
+import os
+from collections import deque
+
+# No window: frames are drawn off screen. Set before pygame starts up.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from replay import TICK_RATE
+from tetris import TetrisGame
+
+# Frames for offline video rendering, drawn by TetrisGame.render() exactly
+# as in the game. The encoding side (ffmpeg or PNGs, the worker pool and the
+# command line) is shared with the Gemini game and lives in the video
+# package at the top of the repository:
+#
+#   python -m video tetris-claude-sonnet-4 videos/ *.replay
+
+
+def replay_frames(seed, events, fps):
+    # Simulates the replay tick by tick and yields the screen every
+    # TICK_RATE / fps ticks, ending on the final board
+    game = TetrisGame(seed)
+    game.replaying = True
+    events = deque(events)
+    running = True
+    while running:
+        for _ in range(TICK_RATE // fps):
+            running = game.update([], events) and bool(events)
+            if not running:
+                break
+        game.render()
+        yield game.screen
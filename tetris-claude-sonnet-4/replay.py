@@ -0,0 +1,91 @@
+import argparse
+import os
+import random
+import struct
+import time
+
+from engine import TetrisEngine
+
+# Replay files: a header holding the game seed, then one 5-byte record per
+# engine step, the simulation tick it happened on and the action byte.
+# Gravity steps are recorded as DOWN actions, so the log alone reproduces
+# the game.
+#
+#   python tetris.py --record game.replay    # play and record
+#   python tetris.py --replay game.replay    # watch it at real time
+#   python replay.py *.replay                # re-simulate at full speed
+
+TICK_RATE = 120  # Simulation ticks per second, the unit of event times
+MAGIC = b"TTRP"
+VERSION = 2  # 1 logged render frames instead of ticks
+HEADER = struct.Struct("<4sBq")
+EVENT = struct.Struct("<IB")
+
+
+def new_seed():
+    return random.randrange(-(2**63), 2**63)
+
+
+class Recorder:
+    def __init__(self, seed):
+        self.seed = seed
+        self.events = bytearray()
+
+    def record(self, tick, action):
+        self.events += EVENT.pack(tick, action)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed))
+            f.write(self.events)
+
+
+def numbered(path, game):
+    # File for the game-th game of a session: game.replay, game-2.replay, ...
+    if game == 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{game}{ext}"
+
+
+def load(path):
+    # -> (seed, [(tick, action), ...])
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} replay file")
+    return seed, list(EVENT.iter_unpack(data[HEADER.size :]))
+
+
+def play(seed, events):
+    # Re-simulates a recorded game headless, as fast as the engine allows
+    engine = TetrisEngine(seed=seed)
+    for _, action in events:
+        if not engine.step(action):
+            break
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-simulate recorded games")
+    parser.add_argument("replays", nargs="+")
+    args = parser.parse_args()
+
+    steps = 0
+    start = time.perf_counter()
+    for path in args.replays:
+        seed, events = load(path)
+        engine = play(seed, events)
+        steps += len(events)
+        print(
+            f"{path}: score {engine.score}, lines {engine.lines_cleared}, "
+            f"level {engine.level}, pieces {engine.pieces_placed}"
+            + (", game over" if engine.over else "")
+        )
+    elapsed = time.perf_counter() - start
+    print(f"{len(args.replays)} replays, {steps} steps in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
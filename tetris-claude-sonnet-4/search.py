@@ -0,0 +1,103 @@
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from board import GUARD, TOP
+from engine import (
+    DOWN,
+    DROP,
+    GRID_HEIGHT,
+    GRID_WIDTH,
+    LEFT,
+    RIGHT,
+    ROTATE_CCW,
+    ROTATE_CW,
+    ROTATIONS,
+    SHAPES,
+)
+
+# Move generator: every distinct resting placement of the current piece that
+# TetrisEngine can reach from where it is, with the actions that get it there.
+# Rotation follows the engine: it succeeds in place or not at all, no kicks.
+
+Placement = namedtuple("Placement", "x y rotation cells actions")
+
+STRIDE = GRID_WIDTH + GUARD
+# Visited flags are indexed by (x, y, rotation); x can go negative for
+# templates with empty left columns, hence X_OFFSET
+X_OFFSET = 3
+X_RANGE = GRID_WIDTH + 2 * X_OFFSET
+STATES = X_RANGE * (GRID_HEIGHT + TOP) * 4
+
+MOVES = (
+    (LEFT, -1, 0, 0),
+    (RIGHT, 1, 0, 0),
+    (ROTATE_CW, 0, 0, 1),
+    (ROTATE_CCW, 0, 0, -1),
+    (DOWN, 0, 1, 0),
+)
+
+
+def reachable_placements(engine):
+    return _placements(
+        engine.board.bits,
+        engine.current_piece,
+        engine.current_pos[0],
+        engine.current_pos[1],
+        engine.current_rotation,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _placements(board_bits, piece, x, y, rotation):
+    # Memoized per (board, piece, start state); board_bits is BitBoard.bits
+    shapes = SHAPES[piece]
+    rotations = ROTATIONS[piece]
+
+    def blocked(x, y, rotation):
+        return board_bits & (shapes[rotation].bits << ((y + TOP) * STRIDE + GUARD + x))
+
+    # BFS over every reachable state. Visited covers tested states, valid or
+    # not, so each state costs at most one collision check.
+    visited = bytearray(STATES)
+    visited[((y + TOP) * X_RANGE + x + X_OFFSET) * 4 + rotation] = 1
+    paths = {(x, y, rotation): ()}
+    queue = deque(paths)
+    while queue:
+        state = queue.popleft()
+        x, y, rotation = state
+        for action, dx, dy, turn in MOVES:
+            if turn and rotations == 1:
+                continue
+            nx, ny, nr = x + dx, y + dy, (rotation + turn) % rotations
+            index = ((ny + TOP) * X_RANGE + nx + X_OFFSET) * 4 + nr
+            if visited[index]:
+                continue
+            visited[index] = 1
+            if not blocked(nx, ny, nr):
+                paths[(nx, ny, nr)] = paths[state] + (action,)
+                queue.append((nx, ny, nr))
+
+    # A hard drop from any state lands on the resting state below it. Walk
+    # states bottom-up so each one inherits the landing spot of the state
+    # under it, and keep the shortest action list per landing spot.
+    landing = {}
+    best = {}
+    for state in sorted(paths, key=lambda state: -state[1]):
+        x, y, rotation = state
+        below = (x, y + 1, rotation)
+        target = landing[below] if below in paths else state
+        landing[state] = target
+        path = paths[state] + (DROP,)
+        if target not in best or len(path) < len(best[target]):
+            best[target] = path
+
+    return tuple(
+        Placement(
+            x,
+            y,
+            rotation,
+            tuple((x + cx, y + cy) for cx, cy in shapes[rotation].cells),
+            path,
+        )
+        for (x, y, rotation), path in sorted(best.items())
+    )
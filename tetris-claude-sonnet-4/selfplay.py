@@ -0,0 +1,210 @@
+import argparse
+import csv
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine import (
+    ACTIONS,
+    DOWN,
+    DROP,
+    GRID_HEIGHT,
+    GRID_WIDTH,
+    LEFT,
+    RIGHT,
+    ROTATE_CCW,
+    ROTATE_CW,
+    ROTATIONS,
+    TetrisEngine,
+)
+from search import reachable_placements
+
+# Plays many headless games across a process pool and reports throughput.
+#
+#   python selfplay.py --games 100000 --seed 1 --csv results.csv
+#
+# Game i always uses the seed derived from (--seed, i), so results do not
+# depend on the number of workers or on how games are split into chunks.
+
+RESULT_FIELDS = ("game", "seed", "score", "lines", "level", "pieces", "steps")
+
+# Action -> (dx, dy, rotation turn) for the moves a plan is made of
+MOVES = {
+    LEFT: (-1, 0, 0),
+    RIGHT: (1, 0, 0),
+    DOWN: (0, 1, 0),
+    ROTATE_CW: (0, 0, 1),
+    ROTATE_CCW: (0, 0, -1),
+}
+
+
+def random_policy(engine, rng):
+    return rng.choice(ACTIONS)
+
+
+def evaluate(rows, cells):
+    # Classic weighted heuristic on the board after placing cells
+    rows = rows[:]
+    for x, y in cells:
+        rows[y] |= 1 << x
+    full = (1 << GRID_WIDTH) - 1
+    kept = [row for row in rows if row != full]
+    lines = GRID_HEIGHT - len(kept)
+    rows = [0] * lines + kept
+
+    heights = []
+    holes = 0
+    for x in range(GRID_WIDTH):
+        bit = 1 << x
+        top = next((y for y, row in enumerate(rows) if row & bit), GRID_HEIGHT)
+        heights.append(GRID_HEIGHT - top)
+        holes += sum(1 for row in rows[top:] if not row & bit)
+    bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+    return 0.76 * lines - 0.51 * sum(heights) - 0.36 * holes - 0.18 * bumpiness
+
+
+def piece_state(engine):
+    x, y = engine.current_pos
+    return engine.pieces_placed, engine.current_piece, x, y, engine.current_rotation
+
+
+def after(state, action):
+    # Where a planned action leaves the piece; the search only plans moves
+    # that succeed, and a drop ends the piece
+    if action == DROP:
+        return None
+    placed, piece, x, y, rotation = state
+    dx, dy, turn = MOVES[action]
+    return placed, piece, x + dx, y + dy, (rotation + turn) % ROTATIONS[piece]
+
+
+def greedy_policy():
+    # Picks the best-scoring reachable placement for each new piece, then
+    # plays out its actions one step at a time. Anything else that moves the
+    # piece, like gravity or a lock between two calls, makes the rest of the
+    # plan stale, so it plans again from wherever the piece is.
+    plan = deque()
+    expected = None
+
+    def policy(engine, rng):
+        nonlocal expected
+        state = piece_state(engine)
+        if state != expected:
+            plan.clear()
+        if not plan:
+            placements = reachable_placements(engine)
+            if not placements:
+                expected = None
+                return rng.choice(ACTIONS)
+            rows = engine.board.rows
+            best = max(placements, key=lambda p: evaluate(rows, p.cells))
+            plan.extend(best.actions)
+        action = plan.popleft()
+        expected = after(state, action)
+        return action
+
+    return policy
+
+
+# Name -> factory returning a fresh policy for each game
+POLICIES = {"random": lambda: random_policy, "greedy": greedy_policy}
+
+
+def game_seed(seed, game):
+    return seed * 1_000_003 + game
+
+
+def play_game(game, seed, policy_name, max_steps):
+    policy = POLICIES[policy_name]()
+    engine = TetrisEngine(seed=game_seed(seed, game))
+    rng = random.Random(game_seed(seed, game) ^ 0x5EED)
+    steps = 0
+    while steps < max_steps:
+        steps += 1
+        if not engine.step(policy(engine, rng)):
+            break
+    return (
+        game,
+        game_seed(seed, game),
+        engine.score,
+        engine.lines_cleared,
+        engine.level,
+        engine.pieces_placed,
+        steps,
+    )
+
+
+def play_chunk(first, count, seed, policy_name, max_steps):
+    # Runs in a worker; results go back to the parent as one list per chunk
+    return [
+        play_game(game, seed, policy_name, max_steps)
+        for game in range(first, first + count)
+    ]
+
+
+def positive(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless self-play harness")
+    parser.add_argument("--games", type=positive, default=10_000)
+    parser.add_argument("--workers", type=positive, default=os.process_cpu_count())
+    parser.add_argument("--chunk", type=positive, default=250, help="games per task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--max-steps", type=int, default=100_000)
+    parser.add_argument("--csv", help="write one row per game to this file")
+    args = parser.parse_args()
+
+    writer = None
+    if args.csv:
+        csv_file = open(args.csv, "w", newline="")
+        writer = csv.writer(csv_file)
+        writer.writerow(RESULT_FIELDS)
+
+    games = score = lines = pieces = 0
+    best = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(
+                play_chunk,
+                first,
+                min(args.chunk, args.games - first),
+                args.seed,
+                args.policy,
+                args.max_steps,
+            )
+            for first in range(0, args.games, args.chunk)
+        ]
+        for future in as_completed(futures):
+            results = future.result()
+            for result in results:
+                score += result[2]
+                lines += result[3]
+                pieces += result[5]
+                best = max(best, result[2])
+            games += len(results)
+            if writer:
+                writer.writerows(results)
+    elapsed = time.perf_counter() - start
+
+    if writer:
+        csv_file.close()
+    print(f"games:       {games} ({args.workers} workers, policy {args.policy})")
+    print(f"mean score:  {score / games:.1f} (best {best})")
+    print(f"mean lines:  {lines / games:.2f}")
+    print(f"mean pieces: {pieces / games:.1f}")
+    print(f"time:        {elapsed:.2f}s")
+    print(f"games/s:     {games / elapsed:,.1f}")
+    print(f"pieces/s:    {pieces / elapsed:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
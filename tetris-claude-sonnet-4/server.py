@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import random
+import time
+from array import array
+from collections import defaultdict, deque
+
+from engine import ACTIONS, DOWN, TetrisEngine
+from profiler import FrameProfiler
+from replay import TICK_RATE
+from selfplay import POLICIES
+from stream import HOST, LENGTH, DeltaEncoder, StreamedEngine
+
+# Hosts many headless games in one process. Every connection gets its own
+# session and one tick loop advances all of them at the game's fixed
+# TICK_RATE: queued input first, then gravity, like TetrisGame.update().
+# Gravity is scheduled rather than polled: each session sits in the bucket
+# of the tick its piece next falls on, so a tick only touches the sessions
+# with input or a fall due.
+#
+# Clients send one byte per action (engine.ACTIONS, or RESTART for a new
+# game) and get stream.py frames back: a keyframe on connect, then a delta
+# for every tick their game changed on.
+#
+#   python server.py --port 7778              # TCP on localhost
+#   python server.py --unix /tmp/tetris.sock  # Unix socket
+#   python server.py --bots 2000 --duration 30  # load test with in-process bots
+
+PORT = 7778
+TICK = 1 / TICK_RATE
+MAX_CATCH_UP = 8  # Ticks run back to back before the scheduler drops time
+RESTART = len(ACTIONS)  # Client byte that starts a new game
+INPUTS_PER_TICK = 8  # Input beyond this waits for the next tick
+SEND_LIMIT = 64 * 1024  # Bytes buffered for a client before it skips frames
+BOT_MOVE_TICKS = TICK_RATE // 10  # Bots make ten moves a second
+LISTEN_BACKLOG = 1024  # Connections waiting to be accepted
+REPORT_EVERY = 5  # Seconds between metrics lines
+
+
+def fall_ticks(engine):
+    # Fall speeds are multiples of 50 ms, whole ticks at 120 Hz
+    return max(1, round(engine.fall_speed * TICK_RATE / 1000))
+
+
+class Session:
+    def __init__(self, seed, writer=None, bot=None):
+        self.writer = writer
+        self.bot = bot  # Policy factory for in-process bots
+        self.rng = random.Random(seed)
+        self.encoder = DeltaEncoder()
+        self.inputs = deque()
+        self.fall_at = None  # Tick of the next gravity step
+        self.behind = False  # Skipping frames until the client catches up
+        self.closed = False
+        self.new_game()
+
+    def new_game(self):
+        seed = self.rng.randrange(2**32)
+        if self.writer:
+            # StreamedEngine feeds the encoder from its hooks
+            self.engine = StreamedEngine(self, seed)
+        else:
+            self.engine = TetrisEngine(seed)
+        if self.bot:
+            self.policy = self.bot()
+
+
+class GameServer:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.sessions = set()
+        self.tick = 0
+        self.falls = defaultdict(set)  # tick -> sessions with a fall due
+        self.bots = [[] for _ in range(BOT_MOVE_TICKS)]  # Spread over ticks
+        self.pending = set()  # Sessions with queued input
+        self.profiler = FrameProfiler(REPORT_EVERY * TICK_RATE, TICK * 1000)
+        self.late = array("q", bytes(8 * self.profiler.frames))  # ns
+        self.skipped = 0  # Ticks dropped while overloaded
+
+    def add(self, writer=None, bot=None):
+        session = Session(self.rng.randrange(2**32), writer, bot)
+        self.sessions.add(session)
+        self.schedule(session)
+        if bot:
+            self.bots[len(self.sessions) % BOT_MOVE_TICKS].append(session)
+        return session
+
+    def remove(self, session):
+        session.closed = True
+        session.fall_at = None
+        self.sessions.discard(session)
+
+    def schedule(self, session):
+        session.fall_at = self.tick + fall_ticks(session.engine)
+        self.falls[session.fall_at].add(session)
+
+    def step(self):
+        # One tick for every session
+        profiler = self.profiler
+        profiler.start_frame()
+        tick = self.tick
+        for session in self.bots[tick % BOT_MOVE_TICKS]:
+            engine = session.engine
+            if engine.over:
+                session.inputs.append(RESTART)
+            else:
+                session.inputs.append(session.policy(engine, session.rng))
+            self.pending.add(session)
+
+        changed = set()
+        pending, self.pending = self.pending, set()
+        for session in pending:
+            if session.closed:
+                continue
+            for _ in range(min(INPUTS_PER_TICK, len(session.inputs))):
+                action = session.inputs.popleft()
+                if action == RESTART:
+                    session.new_game()
+                    self.schedule(session)
+                else:
+                    session.engine.step(action)
+            if session.inputs:
+                self.pending.add(session)
+            changed.add(session)
+        profiler.mark("input")
+
+        # Gravity: stale entries (restarted or closed sessions) are skipped
+        for session in self.falls.pop(tick, ()):
+            if session.fall_at == tick:
+                if session.engine.step(DOWN):
+                    self.schedule(session)
+                changed.add(session)
+        profiler.mark("gravity")
+
+        for session in changed:
+            if session.writer:
+                self.send(session)
+        profiler.mark("send")
+        profiler.end_frame()
+        self.tick += 1
+
+    def send(self, session):
+        frame = session.encoder.delta(session.engine)
+        transport = session.writer.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() > SEND_LIMIT:
+            # Not reading: skip frames, it resyncs from a keyframe later
+            session.behind = True
+        elif session.behind:
+            session.behind = False
+            self.write(session, session.encoder.keyframe(session.engine))
+        elif frame:
+            self.write(session, frame)
+
+    def write(self, session, frame):
+        session.writer.write(LENGTH.pack(len(frame)) + frame)
+
+    async def connected(self, reader, writer):
+        session = self.add(writer)
+        session.encoder.delta(session.engine)
+        self.write(session, session.encoder.keyframe(session.engine))
+        try:
+            while data := await reader.read(4096):
+                if max(data) > RESTART:
+                    break  # Not a client of ours
+                session.inputs.extend(data)
+                self.pending.add(session)
+        except ConnectionError:
+            pass
+        finally:
+            self.remove(session)
+            writer.close()
+
+    async def run(self, duration=None):
+        # Keeps tick n at start + n * TICK. I/O is handled while waiting for
+        # the next tick.
+        start = time.perf_counter()
+        stop = duration and start + duration
+        while not stop or time.perf_counter() < stop:
+            target = start + self.tick * TICK
+            await asyncio.sleep(max(0, target - time.perf_counter()))
+            now = time.perf_counter()
+            behind = int((now - target) / TICK)
+            if behind > MAX_CATCH_UP:
+                # Overloaded: drop the time instead of falling further behind
+                start += behind * TICK
+                target += behind * TICK
+                self.skipped += behind
+            self.late[self.profiler.count % self.profiler.frames] = int(
+                (now - target) * 1e9
+            )
+            self.step()
+            if self.tick % (REPORT_EVERY * TICK_RATE) == 0:
+                print(self.report(), flush=True)
+
+    def report(self):
+        # Tick time, how late ticks started and the load it adds up to
+        profiler = self.profiler
+        p50, p99 = profiler.percentiles(profiler.frame_time, (50, 99))
+        late = profiler.percentiles(self.late, (99,))[0]
+        times = profiler.window(profiler.frame_time)
+        load = sum(times) / len(times) / 1e9 / TICK if times else 0
+        capacity = int(len(self.sessions) / load) if load else 0
+        return (
+            f"{len(self.sessions)} sessions  tick p50 {p50:.2f} p99 {p99:.2f} ms  "
+            f"late p99 {late:.2f} ms  load {load:.0%}  "
+            f"capacity ~{capacity}  skipped {self.skipped}"
+        )
+
+
+async def serve(server, host, port, unix=None, duration=None):
+    if unix:
+        listener = await asyncio.start_unix_server(
+            server.connected, unix, backlog=LISTEN_BACKLOG
+        )
+        print(f"serving on {unix}")
+    else:
+        listener = await asyncio.start_server(
+            server.connected, host, port, backlog=LISTEN_BACKLOG
+        )
+        print(f"serving on {host}:{port}")
+    async with listener:
+        await server.run(duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many headless games")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    parser.add_argument("--bots", type=int, default=0, help="in-process bot games")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, help="seed for the sessions' games")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    server = GameServer(args.seed)
+    for _ in range(args.bots):
+        server.add(bot=POLICIES[args.policy])
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix, args.duration))
+    except KeyboardInterrupt:
+        pass
+    print(server.report())
+    print(server.profiler.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import random
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+from engine import (
+    DOWN,
+    GRID_WIDTH,
+    PIECE_IDS,
+    PIECE_TYPES,
+    SHAPES,
+    TetrisEngine,
+)
+from replay import TICK_RATE, load
+
+# Spectator streaming: a running game publishes its state over TCP to any
+# number of watchers. Each length-prefixed frame is a header and a run of
+# ops. Deltas carry only what changed since the previous frame: the cells a
+# piece locked into, the rows a clear removed, the active piece and the
+# score. Keyframes carry the whole state; new and lagging watchers resync
+# from them, and everyone gets one every KEYFRAME_EVERY frames.
+#
+#   python tetris.py --serve 7777          # play and stream
+#   python stream.py serve --port 7777     # stream a bot, or --replay FILE
+#   python stream.py watch --port 7777     # text spectator
+
+HOST = "127.0.0.1"
+PORT = 7777
+FRAME_RATE = 60  # Frames published per second by the headless server
+KEYFRAME_EVERY = 5 * FRAME_RATE
+BACKLOG = 32  # Frames queued per watcher before it counts as lagging
+# Kernel and transport buffering per watcher. Kept small so a slow watcher
+# backs up into its queue, where it is noticed, instead of into the OS.
+SEND_BUFFER = 4096
+
+LENGTH = struct.Struct("<H")
+HEADER = struct.Struct("<BI")  # kind, sequence number
+DELTA = 0
+KEYFRAME = 1
+
+# Ops, each an op byte followed by its payload
+OP_BOARD = 1  # width, height, then every cell's piece id, row by row
+OP_CELLS = 2  # count, then (y * width + x, piece id) per cell
+OP_CLEAR = 3  # count, then the cleared row numbers
+OP_PIECE = 4  # piece id (0 for none), rotation, x, y
+OP_STATS = 5  # score, level, lines, game over
+BOARD = struct.Struct("<BBB")
+COUNT = struct.Struct("<BH")
+CELL = struct.Struct("<HB")
+CLEAR = struct.Struct("<BB")
+PIECE = struct.Struct("<BBBbb")
+STATS = struct.Struct("<BIHIB")
+
+
+class DeltaEncoder:
+    # Turns engine changes into frames. placed() and cleared() are fed from
+    # the engine's hooks as they happen; delta() adds piece and score
+    # changes once per frame.
+    def __init__(self):
+        self.seq = 0
+        self.ops = bytearray()
+        self.board = None  # Board the pending ops apply to
+        self.piece = None
+        self.stats = None
+
+    def placed(self, cells, piece_id):
+        self.ops += COUNT.pack(OP_CELLS, len(cells))
+        for x, y in cells:
+            self.ops += CELL.pack(y * GRID_WIDTH + x, piece_id)
+
+    def cleared(self, lines):
+        self.ops += CLEAR.pack(OP_CLEAR, len(lines)) + bytes(lines)
+
+    def delta(self, engine):
+        # Frame of everything that changed since the last call, or None
+        if engine.board is not self.board:
+            # New game: the pending ops were for the old board
+            self.board = engine.board
+            self.ops = bytearray(board_op(engine))
+        piece = piece_op(engine)
+        if piece != self.piece:
+            self.piece = piece
+            self.ops += piece
+        stats = stats_op(engine)
+        if stats != self.stats:
+            self.stats = stats
+            self.ops += stats
+        if not self.ops:
+            return None
+        self.seq += 1
+        frame = HEADER.pack(DELTA, self.seq) + self.ops
+        self.ops = bytearray()
+        return frame
+
+    def keyframe(self, engine):
+        # The full state as of the last delta()
+        return (
+            HEADER.pack(KEYFRAME, self.seq)
+            + board_op(engine)
+            + piece_op(engine)
+            + stats_op(engine)
+        )
+
+
+def board_op(engine):
+    board = engine.board
+    return BOARD.pack(OP_BOARD, board.width, board.height) + board.tobytes()
+
+
+def piece_op(engine):
+    if engine.over or not engine.current_piece:
+        return PIECE.pack(OP_PIECE, 0, 0, 0, 0)
+    return PIECE.pack(
+        OP_PIECE,
+        PIECE_IDS[engine.current_piece],
+        engine.current_rotation & 3,
+        *engine.current_pos,
+    )
+
+
+def stats_op(engine):
+    return STATS.pack(
+        OP_STATS, engine.score, engine.level, engine.lines_cleared, engine.over
+    )
+
+
+class Watcher:
+    def __init__(self, writer, backlog):
+        self.writer = writer
+        self.queue = asyncio.Queue(backlog)
+        self.synced = False  # Has had the keyframe its queued deltas build on
+
+    def clear(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class StreamServer:
+    # Fans frames out to watchers. send() may be called from another thread
+    # (the pygame loop); everything else runs on the server's event loop.
+    def __init__(self, backlog=BACKLOG, keyframe_every=KEYFRAME_EVERY):
+        self.encoder = DeltaEncoder()
+        self.backlog = backlog
+        self.keyframe_every = keyframe_every
+        self.watchers = set()
+        self.loop = None
+        self.frames = 0
+        self.want_keyframe = False
+        self.sent = 0  # Bytes
+        self.dropped = 0  # Frames dropped from lagging watchers
+
+    async def start(self, host=HOST, port=PORT):
+        self.loop = asyncio.get_running_loop()
+        return await asyncio.start_server(self.connected, host, port)
+
+    def start_thread(self, host=HOST, port=PORT):
+        # Runs the server on its own event loop in a daemon thread
+        started = threading.Event()
+
+        async def run():
+            server = await self.start(host, port)
+            started.set()
+            async with server:
+                await server.serve_forever()
+
+        threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+        started.wait()
+
+    async def connected(self, reader, writer):
+        writer.get_extra_info("socket").setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER
+        )
+        writer.transport.set_write_buffer_limits(SEND_BUFFER)
+        watcher = Watcher(writer, self.backlog)
+        self.watchers.add(watcher)
+        self.want_keyframe = True
+        try:
+            while True:
+                frame = await watcher.queue.get()
+                writer.write(LENGTH.pack(len(frame)) + frame)
+                self.sent += LENGTH.size + len(frame)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.watchers.discard(watcher)
+            writer.close()
+
+    def send(self, engine):
+        # Publishes this frame's changes; call once per frame after the
+        # game logic has run
+        delta = self.encoder.delta(engine)
+        self.frames += 1
+        periodic = self.frames % self.keyframe_every == 0
+        keyframe = None
+        if periodic or self.want_keyframe:
+            self.want_keyframe = False
+            keyframe = self.encoder.keyframe(engine)
+        if self.watchers and (delta or keyframe):
+            self.loop.call_soon_threadsafe(self.publish, delta, keyframe, periodic)
+
+    def publish(self, delta, keyframe, periodic):
+        for watcher in self.watchers:
+            if keyframe and (periodic or not watcher.synced):
+                # A keyframe supersedes anything still queued
+                self.dropped += watcher.queue.qsize()
+                watcher.clear()
+                watcher.queue.put_nowait(keyframe)
+                watcher.synced = True
+            elif not watcher.synced:
+                self.want_keyframe = True
+            elif delta:
+                if watcher.queue.full():
+                    # Lagging: drop its backlog, it resyncs from a keyframe
+                    self.dropped += watcher.queue.qsize() + 1
+                    watcher.clear()
+                    watcher.synced = False
+                    self.want_keyframe = True
+                else:
+                    watcher.queue.put_nowait(delta)
+
+
+class StreamedEngine(TetrisEngine):
+    # Headless engine feeding a server's encoder from its hooks
+    def __init__(self, server, seed=None):
+        self.server = server
+        super().__init__(seed)
+
+    def on_piece_placed(self, cells):
+        self.server.encoder.placed(cells, PIECE_IDS[self.current_piece])
+
+    def on_lines_cleared(self, lines):
+        self.server.encoder.cleared(lines)
+
+
+class Mirror:
+    # Watcher-side copy of a streamed game
+    def __init__(self):
+        self.seq = None  # None until a keyframe arrives
+        self.width = self.height = 0
+        self.cells = bytearray()
+        self.piece = (0, 0, 0, 0)
+        self.score = self.level = self.lines = 0
+        self.over = False
+
+    def apply(self, frame):
+        # False when the frame was skipped waiting for a keyframe
+        kind, seq = HEADER.unpack_from(frame)
+        if kind == DELTA and (self.seq is None or seq != self.seq + 1):
+            self.seq = None  # Missed a frame, the state can't be trusted
+            return False
+        self.seq = seq
+        offset = HEADER.size
+        while offset < len(frame):
+            op = frame[offset]
+            if op == OP_BOARD:
+                _, self.width, self.height = BOARD.unpack_from(frame, offset)
+                offset += BOARD.size
+                size = self.width * self.height
+                self.cells = bytearray(frame[offset : offset + size])
+                offset += size
+            elif op == OP_CELLS:
+                _, count = COUNT.unpack_from(frame, offset)
+                offset += COUNT.size
+                for _ in range(count):
+                    index, piece_id = CELL.unpack_from(frame, offset)
+                    self.cells[index] = piece_id
+                    offset += CELL.size
+            elif op == OP_CLEAR:
+                _, count = CLEAR.unpack_from(frame, offset)
+                offset += CLEAR.size
+                width = self.width
+                for y in sorted(frame[offset : offset + count]):
+                    del self.cells[y * width : (y + 1) * width]
+                    self.cells[0:0] = bytes(width)
+                offset += count
+            elif op == OP_PIECE:
+                self.piece = PIECE.unpack_from(frame, offset)[1:]
+                offset += PIECE.size
+            elif op == OP_STATS:
+                _, self.score, self.level, self.lines, over = STATS.unpack_from(
+                    frame, offset
+                )
+                self.over = bool(over)
+                offset += STATS.size
+            else:
+                raise ValueError(f"unknown op {op}")
+        return True
+
+    def text(self):
+        rows = [
+            ["#" if piece_id else "." for piece_id in self.cells[y : y + self.width]]
+            for y in range(0, len(self.cells), self.width)
+        ]
+        piece_id, rotation, px, py = self.piece
+        if piece_id:
+            for x, y in SHAPES[PIECE_TYPES[piece_id - 1]][rotation].cells:
+                if 0 <= py + y < self.height and 0 <= px + x < self.width:
+                    rows[py + y][px + x] = "@"
+        status = " GAME OVER" if self.over else ""
+        header = f"score {self.score}  level {self.level}  lines {self.lines}"
+        return "\n".join([header + status] + ["".join(row) for row in rows])
+
+
+async def serve(host, port, replay=None, seed=None):
+    # Streams a replay at real time, or a bot playing endless games
+    from selfplay import POLICIES
+
+    server = StreamServer()
+    async with await server.start(host, port):
+        print(f"streaming on {host}:{port}")
+        if replay:
+            seed, events = load(replay)
+            events = deque(events)
+        rng = random.Random(seed)
+        while True:
+            engine = StreamedEngine(server, seed)
+            policy = POLICIES["greedy"]()
+            tick = 0
+            start = time.perf_counter()
+            while True:
+                # Catch up to real time, then publish one frame
+                target = int((time.perf_counter() - start) * TICK_RATE)
+                running = True
+                while running and tick < target:
+                    if replay:
+                        while events and events[0][0] <= tick:
+                            running = engine.step(events.popleft()[1]) and running
+                        running = running and bool(events)
+                    elif tick % (TICK_RATE // 10) == 0:  # Ten moves a second
+                        running = engine.step(policy(engine, rng))
+                        if running and tick % (TICK_RATE // 2) == 0:
+                            running = engine.step(DOWN)
+                    tick += 1
+                server.send(engine)
+                if not running:
+                    break
+                await asyncio.sleep(1 / FRAME_RATE)
+            if replay:
+                server.send(engine)
+                await asyncio.sleep(2)  # Let the last frames go out
+                return
+            seed = rng.randrange(2**32)
+
+
+async def watch(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    mirror = Mirror()
+    received = 0
+    try:
+        while True:
+            (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+            frame = await reader.readexactly(size)
+            received += LENGTH.size + size
+            if mirror.apply(frame):
+                print("\x1b[H\x1b[J" + mirror.text())
+                print(f"{received} bytes received")
+    except asyncio.IncompleteReadError:
+        print("stream ended")
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream games to spectators")
+    parser.add_argument("mode", choices=("serve", "watch"))
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--replay", metavar="FILE", help="stream a recorded game")
+    parser.add_argument("--seed", type=int, help="seed for the bot's games")
+    args = parser.parse_args()
+
+    try:
+        if args.mode == "serve":
+            asyncio.run(serve(args.host, args.port, args.replay, args.seed))
+        else:
+            asyncio.run(watch(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+
+# No window or sound card needed
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from engine import DROP, LEFT, ROTATE_CW
+from replay import load, numbered, play
+from tetris import TetrisGame
+
+
+class RecordedGame(TetrisGame):
+    # Keeps each finished game's final state; restarts don't reset it
+    def game_over(self):
+        self.finished.append(final_state(self))
+        return super().game_over()
+
+
+def final_state(engine):
+    return engine.score, engine.lines_cleared, engine.board.tobytes()
+
+
+def test_restart_keeps_every_game(tmp_path):
+    path = str(tmp_path / "game.replay")
+    pygame.init()
+    game = RecordedGame(seed=1, record=path)
+    game.finished = []
+
+    # R on the game over screen restarts; the first game is hard drops and
+    # the odd move so its log has more than one action in it
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r))
+    moves = [LEFT, ROTATE_CW, DROP]
+    tick = 0
+    while game.game == 1:
+        game.update([moves[tick % len(moves)]], [])
+        tick += 1
+    # A few pieces into the second game, too few to top out
+    for _ in range(5):
+        game.update([DROP], [])
+    second = final_state(game)
+
+    # Quitting saves the game in progress
+    pygame.event.post(pygame.event.Event(pygame.QUIT))
+    game.run()
+
+    first_path, second_path = path, numbered(path, 2)
+    assert second_path.endswith("game-2.replay")
+    engine = play(*load(first_path))
+    assert engine.over
+    assert final_state(engine) == game.finished[0]
+    assert final_state(play(*load(second_path))) == second
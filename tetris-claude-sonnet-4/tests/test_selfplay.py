@@ -0,0 +1,22 @@
+import random
+
+from engine import DOWN, DROP, TetrisEngine
+from selfplay import after, greedy_policy, piece_state
+
+
+def test_greedy_plan_follows_gravity():
+    # Gravity every few moves, the way server.py and stream.py run their
+    # bots: each planned move has to land where the plan says it does
+    engine = TetrisEngine(seed=3)
+    policy = greedy_policy()
+    rng = random.Random(0)
+    for move in range(2000):
+        state = piece_state(engine)
+        action = policy(engine, rng)
+        if not engine.step(action):
+            break
+        if action != DROP:
+            assert piece_state(engine) == after(state, action)
+        if move % 3 == 2 and not engine.step(DOWN):
+            break
+    assert engine.lines_cleared
@@ -0,0 +1,15 @@
+from server import RESTART, GameServer, fall_ticks
+
+
+def test_restarts_schedule_one_fall():
+    # Restarting lands the session in the bucket it is already in; it is
+    # listed there once and falls one row
+    server = GameServer(seed=1)
+    session = server.add()
+    session.inputs.extend([RESTART, RESTART])
+    server.pending.add(session)
+    server.step()
+    assert server.falls[session.fall_at] == {session}
+    for _ in range(fall_ticks(session.engine)):
+        server.step()
+    assert session.engine.current_pos[1] == 1
@@ -1,19 +1,47 @@
+import argparse
 import pygame
-import random
 import math
 import time
+from collections import deque
+from functools import lru_cache
+
+from engine import (
+    DOWN,
+    DROP,
+    GRID_HEIGHT,
+    GRID_WIDTH,
+    LEFT,
+    PIECE_IDS,
+    PIECE_TYPES,
+    RIGHT,
+    ROTATE_CCW,
+    ROTATE_CW,
+    TetrisEngine,
+)
+from particles import ParticleSystem
+from profiler import BUDGET_MS, FrameProfiler, NullProfiler
+from replay import TICK_RATE, Recorder, load, new_seed, numbered
+from stream import StreamServer
 
 # Initialize Pygame
 pygame.init()
 
 # Constants
-GRID_WIDTH = 10
-GRID_HEIGHT = 20
 CELL_SIZE = 30
 GRID_X_OFFSET = 50
 GRID_Y_OFFSET = 50
 WINDOW_WIDTH = 600
 WINDOW_HEIGHT = 700
+MAX_PARTICLES = 1024  # Oldest particles are recycled past this
+
+# The simulation advances in fixed ticks, independent of the frame rate.
+# Each rendered frame runs however many ticks of real time have passed, up
+# to MAX_CATCH_UP; lag beyond that is dropped, so a stall slows the game
+# down instead of fast-forwarding it.
+TICK_MS = 1000 / TICK_RATE
+MAX_CATCH_UP = 8
+LINE_CLEAR_TICKS = TICK_RATE // 2  # Cleared rows flash for half a second
+BACKGROUND_FPS = TICK_RATE // MAX_CATCH_UP  # Slowest rate the game keeps up at
 
 # Colors with vibrant, flashy palette
 COLORS = {
@@ -29,238 +57,151 @@ COLORS = {
     "GHOST": (100, 100, 100, 100),  # Ghost piece
 }
 
-# Tetris pieces
-PIECES = {
-    "I": [["....", "IIII", "....", "...."], [".I..", ".I..", ".I..", ".I.."]],
-    "O": [["OO", "OO"]],
-    "T": [
-        ["...", "TTT", ".T."],
-        [".T.", "TT.", ".T."],
-        [".T.", "TTT", "..."],
-        [".T.", ".TT", ".T."],
-    ],
-    "S": [["...", ".SS", "SS."], ["S..", "SS.", ".S."]],
-    "Z": [["...", "ZZ.", ".ZZ"], [".Z.", "ZZ.", "Z.."]],
-    "J": [
-        ["...", "JJJ", "..J"],
-        ["JJ.", "J..", "J.."],
-        ["J..", "JJJ", "..."],
-        [".J.", ".J.", "JJ."],
-    ],
-    "L": [
-        ["...", "LLL", "L.."],
-        [".L.", ".L.", "LL."],
-        ["..L", "LLL", "..."],
-        ["LL.", ".L.", ".L."],
-    ],
+# Board cells hold piece ids, index 0 is the empty cell
+PIECE_COLORS = [COLORS["EMPTY"]] + [COLORS[piece] for piece in PIECE_TYPES]
+
+# Key bindings
+KEY_ACTIONS = {
+    pygame.K_j: LEFT,  # Move left
+    pygame.K_l: RIGHT,  # Move right
+    pygame.K_k: ROTATE_CW,  # Rotate clockwise
+    pygame.K_i: ROTATE_CCW,  # Rotate counterclockwise
+    pygame.K_SPACE: DROP,  # Drop
 }
+PAUSE_KEY = pygame.K_p
+
+
+# Fonts are loaded once and rendered text is reused until its string changes
+@lru_cache(maxsize=None)
+def get_font(size):
+    return pygame.font.Font(None, size)
 
 
-# Particle class for effects
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.vx = random.uniform(-5, 5)
-        self.vy = random.uniform(-8, -2)
-        self.color = color
-        self.life = 60
-        self.max_life = 60
-
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.2  # gravity
-        self.life -= 1
-
-    def draw(self, screen):
-        if self.life > 0:
-            alpha = int(255 * (self.life / self.max_life))
-            color = (*self.color[:3], alpha)
-            size = int(4 * (self.life / self.max_life))
-            if size > 0:
-                pygame.draw.circle(
-                    screen, self.color[:3], (int(self.x), int(self.y)), size
-                )
-
-
-class TetrisGame:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+@lru_cache(maxsize=256)
+def render_text(font, text, color):
+    return font.render(text, True, color)
+
+
+class TetrisGame(TetrisEngine):
+    def __init__(
+        self, seed=None, record=None, profiler=None, vsync=False, server=None, game=1
+    ):
+        # Restarts reuse the open window
+        self.screen = pygame.display.get_surface() or pygame.display.set_mode(
+            (WINDOW_WIDTH, WINDOW_HEIGHT),
+            pygame.SCALED if vsync else 0,
+            vsync=vsync,
+        )
         pygame.display.set_caption("Flashy Tetris")
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.Font(None, 36)
-        self.big_font = pygame.font.Font(None, 72)
-
-        self.grid = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        self.current_piece = None
-        self.current_pos = [0, 0]
-        self.current_rotation = 0
-        self.score = 0
-        self.level = 1
-        self.lines_cleared = 0
-        self.fall_time = 0
-        self.fall_speed = 500  # milliseconds
-        self.particles = []
+        self.font = get_font(36)
+        self.big_font = get_font(72)
+
+        self.particles = ParticleSystem(MAX_PARTICLES)
         self.line_clear_animation = 0
         self.cleared_lines = []
+        self.fall_time = 0
 
-        self.spawn_piece()
-
-    def spawn_piece(self):
-        piece_type = random.choice(list(PIECES.keys()))
-        self.current_piece = piece_type
-        self.current_pos = [GRID_WIDTH // 2 - 1, 0]
-        self.current_rotation = 0
-
-        # Check game over
-        if self.check_collision():
-            return self.game_over()
-        return True
+        # Retained rendering: the background and grid lines are drawn once,
+        # locked blocks and HUD go to the static layer when the board changes
+        # and each frame only redraws the rects the moving parts touch
+        self.background = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.background.fill((10, 10, 20))  # Dark background
+        self.draw_grid(self.background)
+        self.static = self.background.copy()
+        self.static_dirty = True
+        self.dirty_rects = []
+        self.scene = None  # What the last rendered frame showed
+        self.focused = True
+        self.sprites = {}  # (color, alpha) -> pre-rendered cell surface
+
+        # Input recording: every engine step is logged with its tick number.
+        # Restarts start a new log, saved next to the first (see numbered()).
+        if seed is None:
+            seed = new_seed()
+        self.record = record
+        self.game = game  # Games played this session, this one included
+        self.record_path = record and numbered(record, game)
+        self.recorder = Recorder(seed) if record else None
+        self.replaying = False
+
+        # Phase timings; F3 toggles the overlay when profiling
+        self.profiler = profiler or NullProfiler()
+        self.show_profile = isinstance(profiler, FrameProfiler)
+        self.tick = 0
+        self.lag = 0  # Real time not yet simulated, ms
+
+        # Spectator stream (--serve): board changes go to its encoder as they
+        # happen and each rendered frame publishes a delta
+        self.server = server
+
+        super().__init__(seed)
+
+    def on_piece_placed(self, cells):
+        self.static_dirty = True
+        if self.server:
+            self.server.encoder.placed(cells, PIECE_IDS[self.current_piece])
+        # Add particles
+        self.particles.emit(
+            [GRID_X_OFFSET + x * CELL_SIZE + CELL_SIZE // 2 for x, y in cells],
+            [GRID_Y_OFFSET + y * CELL_SIZE + CELL_SIZE // 2 for x, y in cells],
+            [PIECE_IDS[self.current_piece]] * len(cells),
+            3,
+        )
 
-    def get_piece_shape(self):
-        if self.current_piece:
-            rotations = PIECES[self.current_piece]
-            if len(rotations) == 1:
-                return rotations[0]
-            return rotations[self.current_rotation % len(rotations)]
-        return []
-
-    def check_collision(self, dx=0, dy=0, rotation=0):
-        shape = PIECES[self.current_piece]
-        if len(shape) > 1:
-            test_rotation = (self.current_rotation + rotation) % len(shape)
-            piece_shape = shape[test_rotation]
-        else:
-            piece_shape = shape[0]
-
-        for y, row in enumerate(piece_shape):
-            for x, cell in enumerate(row):
-                if cell != ".":
-                    new_x = self.current_pos[0] + x + dx
-                    new_y = self.current_pos[1] + y + dy
-
-                    if (
-                        new_x < 0
-                        or new_x >= GRID_WIDTH
-                        or new_y >= GRID_HEIGHT
-                        or (new_y >= 0 and self.grid[new_y][new_x] != 0)
-                    ):
-                        return True
-        return False
-
-    def place_piece(self):
-        shape = self.get_piece_shape()
-        for y, row in enumerate(shape):
-            for x, cell in enumerate(row):
-                if cell != ".":
-                    grid_x = self.current_pos[0] + x
-                    grid_y = self.current_pos[1] + y
-                    if 0 <= grid_x < GRID_WIDTH and 0 <= grid_y < GRID_HEIGHT:
-                        self.grid[grid_y][grid_x] = self.current_piece
-
-                        # Add particles
-                        px = GRID_X_OFFSET + grid_x * CELL_SIZE + CELL_SIZE // 2
-                        py = GRID_Y_OFFSET + grid_y * CELL_SIZE + CELL_SIZE // 2
-                        for _ in range(3):
-                            self.particles.append(
-                                Particle(px, py, COLORS[self.current_piece])
-                            )
-
-        self.check_lines()
-        if not self.spawn_piece():
-            return False
-        return True
+    def on_lines_cleared(self, lines):
+        self.static_dirty = True
+        if self.server:
+            self.server.encoder.cleared(lines)
+        self.cleared_lines = lines[:]
+        self.line_clear_animation = LINE_CLEAR_TICKS
+
+        # Add explosion particles
+        cells = [(x, y) for y in lines for x in range(GRID_WIDTH)]
+        self.particles.emit(
+            [GRID_X_OFFSET + x * CELL_SIZE + CELL_SIZE // 2 for x, y in cells],
+            [GRID_Y_OFFSET + y * CELL_SIZE + CELL_SIZE // 2 for x, y in cells],
+            [self.board.get(x, y) for x, y in cells],
+            8,
+        )
 
-    def check_lines(self):
-        lines_to_clear = []
-        for y in range(GRID_HEIGHT):
-            if all(cell != 0 for cell in self.grid[y]):
-                lines_to_clear.append(y)
-
-        if lines_to_clear:
-            self.cleared_lines = lines_to_clear[:]
-            self.line_clear_animation = 30
-
-            # Add explosion particles
-            for y in lines_to_clear:
-                for x in range(GRID_WIDTH):
-                    px = GRID_X_OFFSET + x * CELL_SIZE + CELL_SIZE // 2
-                    py = GRID_Y_OFFSET + y * CELL_SIZE + CELL_SIZE // 2
-                    color = COLORS[self.grid[y][x]]
-                    for _ in range(8):
-                        self.particles.append(Particle(px, py, color))
-
-            # Clear lines and update score
-            for y in sorted(lines_to_clear, reverse=True):
-                del self.grid[y]
-                self.grid.insert(0, [0 for _ in range(GRID_WIDTH)])
-
-            lines_count = len(lines_to_clear)
-            self.lines_cleared += lines_count
-            # Score based on number of lines cleared simultaneously
-            score_multiplier = [0, 100, 300, 500, 800][min(lines_count, 4)]
-            self.score += score_multiplier * (self.level + 1)
-            self.level = self.lines_cleared // 10 + 1
-            self.fall_speed = max(50, 500 - (self.level - 1) * 50)
-
-    def move_piece(self, dx, dy):
-        if not self.check_collision(dx, dy):
-            self.current_pos[0] += dx
-            self.current_pos[1] += dy
-            return True
-        return False
-
-    def rotate_piece(self, direction):
-        if self.current_piece and len(PIECES[self.current_piece]) > 1:
-            if not self.check_collision(rotation=direction):
-                self.current_rotation = (self.current_rotation + direction) % len(
-                    PIECES[self.current_piece]
-                )
-
-    def drop_piece(self):
-        while self.move_piece(0, 1):
-            pass
-        self.place_piece()
-
-    def get_ghost_position(self):
-        ghost_y = self.current_pos[1]
-        while not self.check_collision(0, ghost_y - self.current_pos[1] + 1):
-            ghost_y += 1
-        return ghost_y
-
-    def draw_cell(self, x, y, color, alpha=255):
-        rect = pygame.Rect(
+    def cell_sprite(self, color, alpha=255):
+        # Cells are rendered once per (color, alpha) in display format, so
+        # drawing one is a single blit. Flashing rows bake their flash level
+        # into the color.
+        sprite = self.sprites.get((color, alpha))
+        if sprite is None:
+            size = CELL_SIZE - 1
+            sprite = pygame.Surface((size, size))
+            sprite.fill(color)
+            if alpha == 255:
+                # Create gradient effect: highlight, then shadow
+                highlight_color = tuple(min(255, c + 40) for c in color)
+                pygame.draw.rect(sprite, highlight_color, (2, 2, size - 8, size - 8))
+                shadow_color = tuple(max(0, c - 40) for c in color)
+                pygame.draw.rect(sprite, shadow_color, (4, 4, size - 12, size - 12))
+                sprite = sprite.convert()
+            else:
+                # Ghost piece - semi-transparent
+                sprite = sprite.convert()
+                sprite.set_alpha(alpha)
+            self.sprites[(color, alpha)] = sprite
+        return sprite
+
+    def cell_rect(self, x, y):
+        return pygame.Rect(
             GRID_X_OFFSET + x * CELL_SIZE,
             GRID_Y_OFFSET + y * CELL_SIZE,
             CELL_SIZE - 1,
             CELL_SIZE - 1,
         )
 
-        # Create gradient effect
-        if alpha == 255:
-            # Main color
-            pygame.draw.rect(self.screen, color, rect)
-            # Highlight
-            highlight_rect = pygame.Rect(
-                rect.x + 2, rect.y + 2, rect.width - 8, rect.height - 8
-            )
-            highlight_color = tuple(min(255, c + 40) for c in color)
-            pygame.draw.rect(self.screen, highlight_color, highlight_rect)
-            # Shadow
-            shadow_rect = pygame.Rect(
-                rect.x + 4, rect.y + 4, rect.width - 12, rect.height - 12
-            )
-            shadow_color = tuple(max(0, c - 40) for c in color)
-            pygame.draw.rect(self.screen, shadow_color, shadow_rect)
-        else:
-            # Ghost piece - semi-transparent
-            s = pygame.Surface((CELL_SIZE - 1, CELL_SIZE - 1))
-            s.set_alpha(alpha)
-            s.fill(color)
-            self.screen.blit(s, (rect.x, rect.y))
+    def draw_cell(self, surface, x, y, color, alpha=255):
+        rect = self.cell_rect(x, y)
+        surface.blit(self.cell_sprite(color, alpha), rect)
+        return rect
 
-    def draw_grid(self):
+    def draw_grid(self, surface):
         # Draw background
         bg_rect = pygame.Rect(
             GRID_X_OFFSET,
@@ -268,7 +209,7 @@ class TetrisGame:
             GRID_WIDTH * CELL_SIZE,
             GRID_HEIGHT * CELL_SIZE,
         )
-        pygame.draw.rect(self.screen, COLORS["EMPTY"], bg_rect)
+        pygame.draw.rect(surface, COLORS["EMPTY"], bg_rect)
 
         # Draw grid lines with glow effect
         for x in range(GRID_WIDTH + 1):
@@ -277,7 +218,7 @@ class TetrisGame:
                 GRID_X_OFFSET + x * CELL_SIZE,
                 GRID_Y_OFFSET + GRID_HEIGHT * CELL_SIZE,
             )
-            pygame.draw.line(self.screen, COLORS["GRID"], start_pos, end_pos)
+            pygame.draw.line(surface, COLORS["GRID"], start_pos, end_pos)
 
         for y in range(GRID_HEIGHT + 1):
             start_pos = (GRID_X_OFFSET, GRID_Y_OFFSET + y * CELL_SIZE)
@@ -285,61 +226,70 @@ class TetrisGame:
                 GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE,
                 GRID_Y_OFFSET + y * CELL_SIZE,
             )
-            pygame.draw.line(self.screen, COLORS["GRID"], start_pos, end_pos)
+            pygame.draw.line(surface, COLORS["GRID"], start_pos, end_pos)
 
-    def draw_placed_pieces(self):
+    def draw_placed_pieces(self, surface):
+        blits = []
         for y in range(GRID_HEIGHT):
             for x in range(GRID_WIDTH):
-                if self.grid[y][x] != 0:
+                piece_id = self.board.get(x, y)
+                if piece_id != 0:
                     # Flash effect for cleared lines
                     if y in self.cleared_lines and self.line_clear_animation > 0:
-                        flash_intensity = int(100 * (self.line_clear_animation / 30))
+                        flash_intensity = int(
+                            100 * (self.line_clear_animation / LINE_CLEAR_TICKS)
+                        )
                         color = tuple(
                             min(255, c + flash_intensity)
-                            for c in COLORS[self.grid[y][x]]
+                            for c in PIECE_COLORS[piece_id]
                         )
                     else:
-                        color = COLORS[self.grid[y][x]]
-                    self.draw_cell(x, y, color)
+                        color = PIECE_COLORS[piece_id]
+                    blits.append((self.cell_sprite(color), self.cell_rect(x, y)))
+        surface.blits(blits, doreturn=False)
 
-    def draw_current_piece(self):
+    def draw_current_piece(self, surface):
+        rects = []
         if self.current_piece:
             # Draw ghost piece
             ghost_y = self.get_ghost_position()
-            shape = self.get_piece_shape()
-            for y, row in enumerate(shape):
-                for x, cell in enumerate(row):
-                    if cell != ".":
-                        grid_x = self.current_pos[0] + x
-                        grid_y = ghost_y + y
-                        if 0 <= grid_x < GRID_WIDTH and 0 <= grid_y < GRID_HEIGHT:
-                            self.draw_cell(
-                                grid_x, grid_y, COLORS[self.current_piece], 50
-                            )
+            cells = self.get_shape().cells
+            for x, y in cells:
+                grid_x = self.current_pos[0] + x
+                grid_y = ghost_y + y
+                if 0 <= grid_x < GRID_WIDTH and 0 <= grid_y < GRID_HEIGHT:
+                    rects.append(
+                        self.draw_cell(
+                            surface, grid_x, grid_y, COLORS[self.current_piece], 50
+                        )
+                    )
 
             # Draw current piece
-            for y, row in enumerate(shape):
-                for x, cell in enumerate(row):
-                    if cell != ".":
-                        grid_x = self.current_pos[0] + x
-                        grid_y = self.current_pos[1] + y
-                        if 0 <= grid_x < GRID_WIDTH and 0 <= grid_y < GRID_HEIGHT:
-                            self.draw_cell(grid_x, grid_y, COLORS[self.current_piece])
-
-    def draw_ui(self):
+            for x, y in cells:
+                grid_x = self.current_pos[0] + x
+                grid_y = self.current_pos[1] + y
+                if 0 <= grid_x < GRID_WIDTH and 0 <= grid_y < GRID_HEIGHT:
+                    rects.append(
+                        self.draw_cell(
+                            surface, grid_x, grid_y, COLORS[self.current_piece]
+                        )
+                    )
+        return rects
+
+    def draw_ui(self, surface):
         # Score
-        score_text = self.font.render(f"Score: {self.score}", True, (255, 255, 255))
-        self.screen.blit(score_text, (GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20, 50))
+        score_text = render_text(self.font, f"Score: {self.score}", (255, 255, 255))
+        surface.blit(score_text, (GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20, 50))
 
         # Level
-        level_text = self.font.render(f"Level: {self.level}", True, (255, 255, 255))
-        self.screen.blit(level_text, (GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20, 90))
+        level_text = render_text(self.font, f"Level: {self.level}", (255, 255, 255))
+        surface.blit(level_text, (GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20, 90))
 
         # Lines
-        lines_text = self.font.render(
-            f"Lines: {self.lines_cleared}", True, (255, 255, 255)
+        lines_text = render_text(
+            self.font, f"Lines: {self.lines_cleared}", (255, 255, 255)
         )
-        self.screen.blit(lines_text, (GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20, 130))
+        surface.blit(lines_text, (GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20, 130))
 
         # Controls
         controls = [
@@ -353,116 +303,283 @@ class TetrisGame:
         ]
         for i, text in enumerate(controls):
             color = (255, 255, 0) if i == 0 else (200, 200, 200)
-            control_text = pygame.font.Font(None, 24).render(text, True, color)
-            self.screen.blit(
+            control_text = render_text(get_font(24), text, color)
+            surface.blit(
                 control_text,
                 (GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20, 200 + i * 25),
             )
 
-    def draw_particles(self):
-        for particle in self.particles[:]:
-            particle.update()
-            if particle.life <= 0:
-                self.particles.remove(particle)
-            else:
-                particle.draw(self.screen)
+    def draw_particles(self, surface):
+        # Interpolate: draw particles where they are between two ticks
+        ahead = self.lag / TICK_MS * 60 / TICK_RATE
+        return [
+            pygame.draw.circle(surface, PIECE_COLORS[color], (x, y), size)
+            for x, y, size, color in self.particles.visible(ahead)
+        ]
 
-    def game_over(self):
-        # Game over screen with particles
+    def render(self):
+        # Locked blocks and the HUD only change when a piece locks or lines
+        # clear (and while cleared rows flash); otherwise restore last
+        # frame's moving parts from the static layer and redraw them
+        profiler = self.profiler
+
+        # Between gravity steps the picture only moves with particles, the
+        # line clear flash or the profiler overlay; skip identical frames
+        scene = (
+            self.current_piece,
+            self.current_rotation,
+            *self.current_pos,
+            len(self.particles),  # Renders once more after the last one dies
+            self.line_clear_animation,
+        )
+        moving = len(self.particles) or self.line_clear_animation
+        if scene == self.scene and not (
+            moving or self.static_dirty or self.show_profile
+        ):
+            return
+        self.scene = scene
+
+        if self.static_dirty or self.line_clear_animation > 0:
+            self.static.blit(self.background, (0, 0))
+            profiler.mark("draw_grid")
+            self.draw_placed_pieces(self.static)
+            profiler.mark("draw_placed_pieces")
+            self.draw_ui(self.static)
+            profiler.mark("draw_ui")
+            self.static_dirty = False
+            self.screen.blit(self.static, (0, 0))
+            rects = [self.screen.get_rect()]
+        else:
+            rects = self.dirty_rects
+            for rect in rects:
+                self.screen.blit(self.static, rect, rect)
+        profiler.mark("restore")
+
+        self.dirty_rects = self.draw_current_piece(self.screen)
+        profiler.mark("draw_current_piece")
+        self.dirty_rects += self.draw_particles(self.screen)
+        profiler.mark("draw_particles")
+        if self.show_profile and self.profiler.count:
+            self.dirty_rects.append(self.draw_profile(self.screen))
+        pygame.display.update(rects + self.dirty_rects)
+        profiler.mark("display.update")
+
+    def draw_profile(self, surface):
+        # Last frame's time, the p99 frame time and the slowest phase
+        frame_ms, phase, phase_ms = self.profiler.last_frame()
+        p99 = self.profiler.percentiles(self.profiler.frame_time, (99,))[0]
+        text = get_font(24).render(
+            f"frame {frame_ms:5.1f} ms  p99 {p99:5.1f}  {phase} {phase_ms:5.1f}",
+            True,
+            (255, 80, 80) if frame_ms > BUDGET_MS else (200, 255, 200),
+        )
+        rect = text.get_rect(topleft=(4, 4)).inflate(8, 4)
+        surface.fill((0, 0, 0), rect)
+        surface.blit(text, (6, 6))
+        return rect
+
+    def step(self, action):
+        if self.recorder:
+            self.recorder.record(self.tick, action)
+        return super().step(action)
+
+    def show_message(self, title, color, lines):
+        # Dims the frame on screen and writes a title and lines over it
         overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
         overlay.set_alpha(180)
         overlay.fill((0, 0, 0))
         self.screen.blit(overlay, (0, 0))
 
-        game_over_text = self.big_font.render("GAME OVER", True, (255, 0, 0))
-        text_rect = game_over_text.get_rect(
+        title_text = render_text(self.big_font, title, color)
+        title_rect = title_text.get_rect(
             center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50)
         )
-        self.screen.blit(game_over_text, text_rect)
+        self.screen.blit(title_text, title_rect)
 
-        final_score_text = self.font.render(
-            f"Final Score: {self.score}", True, (255, 255, 255)
-        )
-        score_rect = final_score_text.get_rect(
-            center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 20)
-        )
-        self.screen.blit(final_score_text, score_rect)
-
-        restart_text = self.font.render(
-            "Press R to restart or Q to quit", True, (255, 255, 255)
-        )
-        restart_rect = restart_text.get_rect(
-            center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 60)
-        )
-        self.screen.blit(restart_text, restart_rect)
+        for i, line in enumerate(lines):
+            text = render_text(self.font, line, (255, 255, 255))
+            rect = text.get_rect(
+                center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 20 + 40 * i)
+            )
+            self.screen.blit(text, rect)
 
         pygame.display.flip()
 
-        # Wait for input
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        self.__init__()  # Restart
-                        return True
-                    elif event.key == pygame.K_q:
-                        return False
+    def wait_for_key(self, keys):
+        # Sleeps until one of keys is pressed; returns it, or None on quit.
+        # Nothing on screen changes meanwhile, so there is nothing to draw.
+        while True:
+            event = pygame.event.wait()
+            if event.type == pygame.QUIT:
+                return None
+            if event.type == pygame.KEYDOWN and event.key in keys:
+                return event.key
+
+    def pause(self):
+        # Freezes the simulation and rendering; returns False to quit
+        self.show_message("PAUSED", (255, 255, 0), ["Press P to resume or Q to quit"])
+        if self.wait_for_key((PAUSE_KEY, pygame.K_q)) != PAUSE_KEY:
+            return False
+        self.static_dirty = True  # Clear the overlay
+        self.clock.tick()  # The paused time is not simulated
+        return True
+
+    def game_over(self):
+        if self.replaying:
+            # Keep showing the final board until the viewer quits
+            return TetrisEngine.game_over(self)
+        if self.recorder:
+            self.recorder.save(self.record_path)
+
+        self.show_message(
+            "GAME OVER",
+            (255, 0, 0),
+            [f"Final Score: {self.score}", "Press R to restart or Q to quit"],
+        )
+        if self.wait_for_key((pygame.K_r, pygame.K_q)) != pygame.K_r:
+            return False
+        self.__init__(
+            record=self.record,
+            profiler=self.profiler,
+            server=self.server,
+            game=self.game + 1,
+        )
         return True
 
-    def run(self):
+    def idle(self):
+        # With nothing animating, frames look the same until the piece falls
+        # or input comes in: sleep until whichever is first. Returns the ms
+        # slept, which the next frame catches up on.
+        if self.replaying or len(self.particles) or self.line_clear_animation:
+            return 0
+        wait = int(self.fall_speed - self.fall_time - self.lag)
+        if wait <= 0:
+            return 0
+        event = pygame.event.wait(wait)
+        if event.type != pygame.NOEVENT:
+            pygame.event.post(event)  # Handled by the next frame
+        return wait
+
+    def update(self, actions, events):
+        # One simulation tick: input, gravity and animations. Returns False
+        # once the game is over.
+        running = True
+        if self.replaying:
+            # Recorded input, gravity steps included
+            while events and events[0][0] <= self.tick:
+                self.step(events.popleft()[1])
+        else:
+            for action in actions:
+                running = self.step(action) and running
+            # Natural fall; the remainder carries over so the rate stays exact
+            self.fall_time += TICK_MS
+            if self.fall_time >= self.fall_speed:
+                self.fall_time -= self.fall_speed
+                running = self.step(DOWN) and running
+
+        # Update animations
+        if self.line_clear_animation > 0:
+            self.line_clear_animation -= 1
+            if self.line_clear_animation == 0:
+                self.cleared_lines = []
+        self.particles.update(60 / TICK_RATE)
+        self.tick += 1
+        return running
+
+    def run(self, events=None, fps=60):
+        # events: a recorded (tick, action) log to play back instead of
+        # taking keyboard input and running gravity. fps caps the render
+        # rate, 0 renders as fast as possible (or at the display's rate
+        # with vsync).
         running = True
+        self.replaying = events is not None
+        events = deque(events or ())
+        actions = []
+        slept = 0  # ms last spent idle, simulated on top of MAX_CATCH_UP
 
         while running:
-            dt = self.clock.tick(60)
-            self.fall_time += dt
+            # Unfocused windows render just fast enough for the simulation
+            dt = self.clock.tick(fps if self.focused else BACKGROUND_FPS)
+            self.lag = min(self.lag + dt, MAX_CATCH_UP * TICK_MS + slept)
+            self.profiler.start_frame()
 
             # Handle events
+            paused = False
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.WINDOWFOCUSLOST:
+                    self.focused = False
+                elif event.type == pygame.WINDOWFOCUSGAINED:
+                    self.focused = True
                 elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_j:  # Move left
-                        self.move_piece(-1, 0)
-                    elif event.key == pygame.K_l:  # Move right
-                        self.move_piece(1, 0)
-                    elif event.key == pygame.K_k:  # Rotate clockwise
-                        self.rotate_piece(1)
-                    elif event.key == pygame.K_i:  # Rotate counterclockwise
-                        self.rotate_piece(-1)
-                    elif event.key == pygame.K_SPACE:  # Drop
-                        self.drop_piece()
-                    elif event.key == pygame.K_q:  # Quit game
+                    if event.key == pygame.K_q:  # Quit game
                         running = False
-
-            # Natural fall
-            if self.fall_time >= self.fall_speed:
-                if not self.move_piece(0, 1):
-                    if not self.place_piece():
-                        running = False
-                self.fall_time = 0
-
-            # Update animations
-            if self.line_clear_animation > 0:
-                self.line_clear_animation -= 1
-                if self.line_clear_animation == 0:
-                    self.cleared_lines = []
-
-            # Draw everything
-            self.screen.fill((10, 10, 20))  # Dark background
-            self.draw_grid()
-            self.draw_placed_pieces()
-            self.draw_current_piece()
-            self.draw_particles()
-            self.draw_ui()
-
-            pygame.display.flip()
-
+                    elif event.key == PAUSE_KEY:
+                        paused = True
+                    elif event.key == pygame.K_F3:  # Profiler overlay
+                        self.show_profile = not self.show_profile
+                        self.scene = None  # Redraw with or without it
+                    elif event.key in KEY_ACTIONS and not self.replaying:
+                        actions.append(KEY_ACTIONS[event.key])
+            self.profiler.mark("events")
+            if paused and running:
+                running = self.pause()
+                self.profiler.end_frame()
+                continue  # Drop the frame, its time was spent paused
+
+            # Simulate the ticks this frame covers; input waits for a tick
+            while running and self.lag >= TICK_MS:
+                self.lag -= TICK_MS
+                running = self.update(actions, events)
+                actions = []
+            if self.server:
+                self.server.send(self)
+            self.profiler.mark("logic")
+
+            self.render()
+            self.profiler.end_frame()
+            slept = self.idle()
+
+        if self.recorder:
+            self.recorder.save(self.record_path)
         pygame.quit()
 
 
 if __name__ == "__main__":
-    game = TetrisGame()
-    game.run()
+    parser = argparse.ArgumentParser(description="Flashy Tetris")
+    parser.add_argument("--seed", type=int, help="seed for the piece sequence")
+    parser.add_argument("--record", metavar="FILE", help="save the game's inputs")
+    parser.add_argument("--replay", metavar="FILE", help="watch a recorded game")
+    parser.add_argument(
+        "--fps", type=int, default=60, help="render rate cap, 0 for uncapped"
+    )
+    parser.add_argument("--vsync", action="store_true", help="sync to the display")
+    parser.add_argument(
+        "--profile", action="store_true", help="time each frame phase (F3 overlay)"
+    )
+    parser.add_argument(
+        "--trace", metavar="FILE", help="profile and save a Chrome trace on exit"
+    )
+    parser.add_argument(
+        "--serve", type=int, metavar="PORT", help="stream the game to spectators"
+    )
+    args = parser.parse_args()
+
+    profiler = FrameProfiler() if args.profile or args.trace else None
+    server = None
+    if args.serve:
+        server = StreamServer()
+        server.start_thread(port=args.serve)
+    if args.replay:
+        seed, events = load(args.replay)
+        game = TetrisGame(seed, None, profiler, args.vsync, server)
+        game.run(events, args.fps)
+    else:
+        game = TetrisGame(args.seed, args.record, profiler, args.vsync, server)
+        game.run(fps=args.fps)
+
+    if profiler:
+        print(profiler.summary())
+        if args.trace:
+            profiler.save_trace(args.trace)
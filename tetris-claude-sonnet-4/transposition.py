@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+# Bounded transposition tables for search: evaluated scores keyed by 64-bit
+# position keys (position_key()), so a position reached again by another
+# move order isn't scored twice. Both tables hold at most capacity entries
+# and differ in what they drop when full:
+#
+#   LRUTable    the least recently used entry
+#   DepthTable  one entry per slot (key % capacity); a new entry replaces
+#               the old one unless the old one was searched deeper
+#
+#   table = TABLES["lru"](1 << 16)
+#   score = table.get(key, depth)       # None on a miss
+#   if score is None:
+#       score = evaluate(...)
+#       table.put(key, depth, score)
+#
+# get() only returns scores searched at least depth plies deep, and put()
+# never replaces a deeper score for the same position with a shallower one.
+#
+# Both games carry an identical copy of this module: each directory is a
+# standalone project with nothing shared between them, so change both.
+
+
+class LRUTable:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()  # key -> (depth, score), oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, depth=0):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < depth:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, depth, score):
+        entries = self.entries
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+            if entry[0] > depth:
+                return
+        elif len(entries) >= self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+        entries[key] = (depth, score)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class DepthTable:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # (key, depth, score) or None per slot, so a lookup is one index and
+        # nothing is ever reordered
+        self.slots = [None] * capacity
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return self.size
+
+    def get(self, key, depth=0):
+        entry = self.slots[key % self.capacity]
+        if entry is None or entry[0] != key or entry[1] < depth:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key, depth, score):
+        index = key % self.capacity
+        entry = self.slots[index]
+        if entry is None:
+            self.size += 1
+        elif entry[1] > depth:
+            return  # Same position or not, the deeper result stays
+        elif entry[0] != key:
+            self.evictions += 1
+        self.slots[index] = (key, depth, score)
+
+    def clear(self):
+        self.slots = [None] * self.capacity
+        self.size = 0
+
+
+# Eviction policies by name
+TABLES = {"lru": LRUTable, "depth": DepthTable}
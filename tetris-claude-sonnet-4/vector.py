@@ -0,0 +1,158 @@
+import numpy as np
+
+from engine import (
+    DOWN,
+    DROP,
+    GRID_HEIGHT,
+    GRID_WIDTH,
+    LEFT,
+    LINE_SCORES,
+    PIECE_TYPES,
+    RIGHT,
+    ROTATE_CCW,
+    ROTATE_CW,
+    ROTATIONS,
+    SHAPES,
+)
+
+# N games stepped in lockstep with array operations, same rules as
+# TetrisEngine. Boards hold piece ids (0 empty, PIECE_TYPES index + 1), the
+# same values BitBoard.cells uses. Finished games reset automatically.
+
+# CELLS[piece, rotation] -> (4, 2) array of (x, y) offsets
+CELLS = np.array(
+    [[shape.cells for shape in SHAPES[piece]] for piece in PIECE_TYPES],
+    dtype=np.int32,
+)
+ROTATION_COUNTS = np.array([ROTATIONS[piece] for piece in PIECE_TYPES])
+SCORE_TABLE = np.array(LINE_SCORES)
+BOARD_CELLS = GRID_WIDTH * GRID_HEIGHT
+
+# Per action (dx, dy, rotation)
+MOVES = np.zeros((max(LEFT, RIGHT, ROTATE_CW, ROTATE_CCW, DOWN, DROP) + 1, 3), int)
+MOVES[LEFT] = (-1, 0, 0)
+MOVES[RIGHT] = (1, 0, 0)
+MOVES[ROTATE_CW] = (0, 0, 1)
+MOVES[ROTATE_CCW] = (0, 0, -1)
+MOVES[DOWN] = (0, 1, 0)
+
+
+class VectorTetris:
+    def __init__(self, num_envs, seed=None):
+        self.num_envs = num_envs
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros((num_envs, GRID_HEIGHT, GRID_WIDTH), np.uint8)
+        self.cells = self.boards.reshape(-1)  # Flat view for fancy indexing
+        self.piece = np.zeros(num_envs, np.int32)
+        self.rotation = np.zeros(num_envs, np.int32)
+        self.x = np.zeros(num_envs, np.int32)
+        self.y = np.zeros(num_envs, np.int32)
+        self.score = np.zeros(num_envs, np.int64)
+        self.level = np.ones(num_envs, np.int32)
+        self.lines_cleared = np.zeros(num_envs, np.int32)
+        self.pieces_placed = np.zeros(num_envs, np.int32)
+        # Stats of the last finished game in each env
+        self.final_score = np.zeros(num_envs, np.int64)
+        self.final_lines = np.zeros(num_envs, np.int32)
+        self.final_pieces = np.zeros(num_envs, np.int32)
+        self.games_finished = 0
+        self._all = np.arange(num_envs)
+        self.reset()
+
+    def reset(self, envs=None):
+        envs = self._all if envs is None else envs
+        self.boards[envs] = 0
+        self.score[envs] = 0
+        self.level[envs] = 1
+        self.lines_cleared[envs] = 0
+        self.pieces_placed[envs] = 0
+        self.spawn(envs)
+
+    def spawn(self, envs):
+        self.piece[envs] = self.rng.integers(0, len(PIECE_TYPES), len(envs))
+        self.rotation[envs] = 0
+        self.x[envs] = GRID_WIDTH // 2 - 1
+        self.y[envs] = 0
+
+    def fits(self, envs, rotation, x, y):
+        cells = CELLS[self.piece[envs], rotation & 3]
+        xs = x[:, None] + cells[:, :, 0]
+        ys = y[:, None] + cells[:, :, 1]
+        inside = (xs >= 0) & (xs < GRID_WIDTH) & (ys < GRID_HEIGHT)
+        visible = ys >= 0
+        flat = (
+            envs[:, None] * BOARD_CELLS
+            + np.clip(ys, 0, GRID_HEIGHT - 1) * GRID_WIDTH
+            + np.clip(xs, 0, GRID_WIDTH - 1)
+        )
+        taken = self.cells.take(flat)
+        return (inside & ~(visible & (taken != 0))).all(axis=1)
+
+    def step(self, actions):
+        # Returns (reward, done) arrays; done envs are already reset
+        actions = np.asarray(actions)
+        envs = self._all
+        dx, dy, drot = MOVES[actions].T
+        rotation = (self.rotation + drot) % ROTATION_COUNTS[self.piece]
+        x = self.x + dx
+        y = self.y + dy
+        moved = self.fits(envs, rotation, x, y)
+        self.rotation = np.where(moved, rotation, self.rotation)
+        self.x = np.where(moved, x, self.x)
+        self.y = np.where(moved, y, self.y)
+
+        # Hard drop: fall until the next row collides
+        falling = envs[actions == DROP]
+        while len(falling):
+            ok = self.fits(
+                falling, self.rotation[falling], self.x[falling], self.y[falling] + 1
+            )
+            falling = falling[ok]
+            self.y[falling] += 1
+
+        lock = envs[((actions == DOWN) & ~moved) | (actions == DROP)]
+        reward = np.zeros(self.num_envs, np.int64)
+        done = np.zeros(self.num_envs, bool)
+        if len(lock):
+            self.lock(lock, reward, done)
+        return reward, done
+
+    def lock(self, envs, reward, done):
+        cells = CELLS[self.piece[envs], self.rotation[envs]]
+        xs = self.x[envs, None] + cells[:, :, 0]
+        ys = self.y[envs, None] + cells[:, :, 1]
+        visible = ys >= 0
+        rows = np.broadcast_to(envs[:, None], ys.shape)
+        self.boards[rows[visible], ys[visible], xs[visible]] = np.broadcast_to(
+            self.piece[envs, None] + 1, ys.shape
+        )[visible]
+        self.pieces_placed[envs] += 1
+
+        # Clear full rows: stable-sort kept rows below the cleared ones, then
+        # blank the rows that moved to the top
+        boards = self.boards[envs]
+        full = (boards != 0).all(axis=2)
+        count = full.sum(axis=1)
+        cleared = count > 0
+        if cleared.any():
+            idx = envs[cleared]
+            order = np.argsort(~full[cleared], axis=1, kind="stable")
+            boards = np.take_along_axis(boards[cleared], order[:, :, None], axis=1)
+            boards[np.arange(GRID_HEIGHT) < count[cleared, None]] = 0
+            self.boards[idx] = boards
+
+            gained = SCORE_TABLE[np.minimum(count[cleared], 4)] * (self.level[idx] + 1)
+            reward[idx] = gained
+            self.score[idx] += gained
+            self.lines_cleared[idx] += count[cleared]
+            self.level[idx] = self.lines_cleared[idx] // 10 + 1
+
+        self.spawn(envs)
+        over = envs[~self.fits(envs, self.rotation[envs], self.x[envs], self.y[envs])]
+        if len(over):
+            done[over] = True
+            self.final_score[over] = self.score[over]
+            self.final_lines[over] = self.lines_cleared[over]
+            self.final_pieces[over] = self.pieces_placed[over]
+            self.games_finished += len(over)
+            self.reset(over)
@@ -0,0 +1,232 @@
+import copy
+import random
+from functools import lru_cache
+
+# Bitboard backend: bit c of row r's mask is set when cell (r, c) is
+# occupied. Piece ids for rendering live in a separate bytearray plane.
+#
+# Collision tests use one packed integer holding every row. Each packed row
+# is GUARD wall bits followed by the row's cells, there are TOP empty rows
+# above the board for pieces poking out of it and FLOOR solid rows below.
+# Pieces are packed the same way, so a collision test is one shift and AND.
+#
+# Boards also keep a Zobrist key of their occupancy for transposition
+# tables: the XOR of a random 64-bit key per (row, row mask), 0 for empty
+# rows. Placing cells XORs the changed rows' old and new keys, and clearing
+# lines redoes only the rows that moved, from the top of the stack down.
+
+GUARD = 3
+TOP = 4
+FLOOR = 4
+
+
+def zobrist_keys(name, states):
+    # state -> random 64-bit key. Seeded by name, so keys are the same in
+    # every run and tables with different names don't share keys.
+    rng = random.Random(f"zobrist {name}")
+    return {state: rng.getrandbits(64) for state in states}
+
+
+@lru_cache(maxsize=None)
+def row_keys(width, height):
+    # row_keys(...)[row][mask], the key of an empty row is 0
+    rng = random.Random(f"zobrist rows {width}x{height}")
+    return tuple(
+        (0,) + tuple(rng.getrandbits(64) for _ in range(1, 1 << width))
+        for _ in range(height)
+    )
+
+
+@lru_cache(maxsize=None)
+def shape_bits(shape_coords, width):
+    # (row, col) offsets -> (top, left, packed bits) relative to the top-left
+    top = min(r for r, c in shape_coords)
+    left = min(c for r, c in shape_coords)
+    masks = [0] * (max(r for r, c in shape_coords) - top + 1)
+    for r, c in shape_coords:
+        masks[r - top] |= 1 << (c - left)
+    return top, left, pack_masks(masks, width)
+
+
+@lru_cache(maxsize=None)
+def shape_bottom(shape_coords):
+    # (row, col) offsets -> the lowest offset in each occupied column
+    bottom = {}
+    for r, c in shape_coords:
+        bottom[c] = max(bottom.get(c, r), r)
+    return tuple((r, c) for c, r in sorted(bottom.items()))
+
+
+def pack_masks(masks, width):
+    # Piece row masks (top row first, bit 0 at the piece's column x) -> packed bits
+    stride = width + GUARD
+    return sum(mask << (dy * stride) for dy, mask in enumerate(masks))
+
+
+class BitBoard:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.full_mask = (1 << width) - 1
+        # Row data lives in slots: masks[s] and the width-byte run of cells
+        # at s * width. order[r] is the slot showing row r, so collapsing
+        # cleared rows moves slot numbers and never copies cells.
+        self.order = list(range(height))
+        self.masks = [0] * height
+        self.cells = bytearray(width * height)
+        # Rows that filled up since the last clear
+        self.filled = set()
+        # Stack height per column: height minus its topmost occupied row
+        self.heights = [0] * width
+        # Zobrist key of the occupied cells
+        self.row_keys = row_keys(width, height)
+        self.key = 0
+
+        self.stride = width + GUARD
+        wall = (1 << GUARD) - 1
+        self.walls = sum(
+            wall << (r * self.stride) for r in range(TOP + height + FLOOR)
+        ) | (((1 << (FLOOR * self.stride)) - 1) << ((TOP + height) * self.stride))
+        self.bits = self.walls
+
+    @classmethod
+    def frombytes(cls, width, height, data):
+        # Inverse of tobytes()
+        board = cls(width, height)
+        for i, piece_id in enumerate(data):
+            if piece_id:
+                board.place([divmod(i, width)], piece_id)
+        return board
+
+    def copy(self):
+        board = copy.copy(self)
+        board.order = self.order[:]
+        board.masks = self.masks[:]
+        board.cells = bytearray(self.cells)
+        board.filled = set(self.filled)
+        board.heights = self.heights[:]
+        return board
+
+    def tobytes(self):
+        # One piece id byte per cell, row by row from the top: width * height
+        # bytes, the compact form for storing or sending boards
+        width = self.width
+        return b"".join(
+            self.cells[slot * width : (slot + 1) * width] for slot in self.order
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, BitBoard):
+            return NotImplemented
+        return (
+            self.width == other.width
+            and self.bits == other.bits
+            and self.tobytes() == other.tobytes()
+        )
+
+    def __hash__(self):
+        # Occupancy only: equal boards have equal keys, and boards that
+        # differ only in piece ids are rare enough to leave to __eq__
+        return self.key
+
+    @property
+    def rows(self):
+        # Row masks top to bottom, built on demand
+        return [self.masks[slot] for slot in self.order]
+
+    def collides(self, piece_bits, x, y):
+        # piece_bits come from pack_masks(); y must not be above -TOP
+        return self.bits & (piece_bits << ((y + TOP) * self.stride + GUARD + x)) != 0
+
+    def place(self, cells, piece_id):
+        for r, c in cells:
+            slot = self.order[r]
+            old = self.masks[slot]
+            mask = self.masks[slot] = old | 1 << c
+            keys = self.row_keys[r]
+            self.key ^= keys[old] ^ keys[mask]
+            self.cells[slot * self.width + c] = piece_id
+            self.bits |= 1 << ((r + TOP) * self.stride + GUARD + c)
+            self.heights[c] = max(self.heights[c], self.height - r)
+            if mask == self.full_mask:
+                self.filled.add(r)
+
+    def get(self, r, c):
+        return self.cells[self.order[r] * self.width + c]
+
+    def full_rows(self):
+        return sorted(self.filled)
+
+    def clear_rows(self, lines):
+        # Costs the cleared rows plus a pointer move per row above them; the
+        # rows below the lowest cleared one are not touched
+        lines = sorted(lines)
+        width, stride = self.width, self.stride
+        top, bottom = lines[0], lines[-1]
+
+        # Rows above the stack are empty before and after, and keep key 0.
+        # The rest are keyed out here and back in where they land.
+        keys, masks, order = self.row_keys, self.masks, self.order
+        moved = range(self.height - max(self.heights), bottom + 1)
+        key = self.key
+        for r in moved:
+            key ^= keys[r][masks[order[r]]]
+
+        # Blank the cleared slots and move them to the top, shifting the
+        # rows above each one down
+        cleared = set(lines)
+        slots = [self.order[r] for r in lines]
+        for slot in slots:
+            self.masks[slot] = 0
+            self.cells[slot * width : (slot + 1) * width] = bytes(width)
+        self.order[: bottom + 1] = slots + [
+            slot for r, slot in enumerate(self.order[: bottom + 1]) if r not in cleared
+        ]
+        self.filled = {
+            r + sum(line > r for line in lines) for r in self.filled if r not in cleared
+        }
+        for r in moved:
+            key ^= keys[r][masks[order[r]]]
+        self.key = key
+
+        # Same collapse on the packed bits: everything above a cleared row
+        # moves one row down. Clearing top-down keeps indices valid.
+        occupied = self.bits ^ self.walls
+        for r in lines:
+            cut = (r + TOP) * stride
+            above = occupied & ((1 << cut) - 1)
+            occupied = occupied >> (cut + stride) << (cut + stride) | above << stride
+        self.bits = occupied | self.walls
+
+        # Cleared rows are full, so every column reaches the top one. Columns
+        # topping out above it just lose the cleared rows; those that top out
+        # on it drop to their next occupied cell further down.
+        count = len(lines)
+        pending = 0
+        for c, h in enumerate(self.heights):
+            if h > self.height - top:
+                self.heights[c] = h - count
+            else:
+                pending |= 1 << c
+        for r in range(top + count, self.height):
+            if not pending:
+                break
+            tops = self.masks[self.order[r]] & pending
+            pending &= ~tops
+            while tops:
+                bit = tops & -tops
+                self.heights[bit.bit_length() - 1] = self.height - r
+                tops ^= bit
+        while pending:
+            bit = pending & -pending
+            self.heights[bit.bit_length() - 1] = 0
+            pending ^= bit
+
+    def drop_distance(self, bottom, c, r):
+        # Rows a piece with its pivot at (r, c) can fall, from its bottom
+        # profile (see shape_bottom) and the column heights. None when the
+        # piece is below the surface of a column it covers (slid under an
+        # overhang); the caller has to search then.
+        heights, floor = self.heights, self.height - 1 - r
+        distance = min([floor - dr - heights[c + dc] for dr, dc in bottom])
+        return distance if distance >= 0 else None
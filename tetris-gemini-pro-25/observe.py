@@ -0,0 +1,59 @@
+import numpy as np
+import pygame
+
+from tetris import GRID_HEIGHT, GRID_WIDTH, TETROMINOES
+
+# Observations for training and data collection. Observer fills the same
+# arrays on every call straight from the grid's cell buffer, so a step
+# costs no list building; pixels() hands out a rendered frame as a view of
+# the surface it was drawn on instead of a saved screenshot.
+#
+#   observer = Observer()
+#   obs = observer.observe(state)       # dict of uint8 arrays
+#   frame = pixels(screen, 2)           # (width / 2, height / 2, 3) view
+#   del frame                           # unlocks the surface for drawing
+
+
+def cell_view(grid):
+    # (height, width) uint8 view of the grid's cell bytes, no copy. Rows are
+    # in slot order: row r is view[grid.order[r]].
+    return np.frombuffer(grid.cells, np.uint8).reshape(grid.height, grid.width)
+
+
+class Observer:
+    # The arrays are reused by every call; copy them to keep one
+    def __init__(self):
+        self.grid = np.zeros((GRID_HEIGHT, GRID_WIDTH), np.uint8)  # Piece ids
+        self.active = np.zeros((GRID_HEIGHT, GRID_WIDTH), np.uint8)  # Falling piece
+        self.piece = np.zeros(len(TETROMINOES), np.uint8)  # One-hot
+        self.next = np.zeros(len(TETROMINOES), np.uint8)  # One-hot
+        self.arrays = {
+            "grid": self.grid,
+            "active": self.active,
+            "piece": self.piece,
+            "next": self.next,
+        }
+
+    def observe(self, state):
+        grid = state.grid
+        # One gather from the slot buffer puts the rows in grid order
+        np.take(cell_view(grid), grid.order, axis=0, out=self.grid)
+        self.active.fill(0)
+        self.piece.fill(0)
+        self.next.fill(0)
+        if not state.game_over:
+            piece = state.current_piece
+            for r_offset, c_offset in piece.current_shape_coords:
+                r, c = piece.y + r_offset, piece.x + c_offset
+                if 0 <= r < GRID_HEIGHT and 0 <= c < GRID_WIDTH:
+                    self.active[r, c] = 1
+            self.piece[piece.piece_id - 1] = 1
+        self.next[state.next_piece.piece_id - 1] = 1
+        return self.arrays
+
+
+def pixels(surface, step=1):
+    # The frame as a (width, height, 3) uint8 view of surface, keeping every
+    # step-th pixel each way. The surface stays locked while the view is
+    # alive, so drop it before drawing again.
+    return pygame.surfarray.pixels3d(surface)[::step, ::step]
@@ -0,0 +1,131 @@
+import json
+import time
+from array import array
+
+# Per-frame phase timings. The game loop calls start_frame(), then mark(name)
+# after each phase (the time since the previous mark goes to that phase) and
+# end_frame(). The last `frames` frames are kept in ring buffers, phases a
+# frame skipped count as zero.
+#
+#   python tetris.py --profile             # F3 toggles the overlay
+#   python tetris.py --trace trace.json    # open in chrome://tracing
+
+FRAMES = 600  # Ten seconds at 60 fps
+BUDGET_MS = 1000 / 60
+
+
+class FrameProfiler:
+    def __init__(self, frames=FRAMES):
+        self.frames = frames
+        self.count = 0  # Frames recorded so far
+        self.frame_start = array("q", bytes(8 * frames))  # ns
+        self.frame_time = array("q", bytes(8 * frames))  # ns
+        self.starts = {}  # phase -> offsets from frame start, ns
+        self.durations = {}  # phase -> ns
+        self.current = {}
+        self.origin = time.perf_counter_ns()
+        self.start = self.last = self.origin
+
+    def start_frame(self):
+        self.start = self.last = time.perf_counter_ns()
+        self.current.clear()
+
+    def mark(self, phase):
+        now = time.perf_counter_ns()
+        self.current[phase] = (self.last - self.start, now - self.last)
+        self.last = now
+
+    def end_frame(self):
+        slot = self.count % self.frames
+        self.frame_start[slot] = self.start - self.origin
+        self.frame_time[slot] = self.last - self.start
+        for phase in self.current:
+            if phase not in self.durations:
+                self.starts[phase] = array("q", bytes(8 * self.frames))
+                self.durations[phase] = array("q", bytes(8 * self.frames))
+        for phase, durations in self.durations.items():
+            start, duration = self.current.get(phase, (0, 0))
+            self.starts[phase][slot] = start
+            durations[slot] = duration
+        self.count += 1
+
+    def window(self, samples):
+        return samples[: min(self.count, self.frames)]
+
+    def last_frame(self):
+        # (frame ms, slowest phase, its ms) for the most recent frame
+        slot = (self.count - 1) % self.frames
+        phase = max(self.durations, key=lambda p: self.durations[p][slot])
+        return (
+            self.frame_time[slot] / 1e6,
+            phase,
+            self.durations[phase][slot] / 1e6,
+        )
+
+    def percentiles(self, samples, points=(50, 95, 99)):
+        # ms at each percentile over the buffered frames
+        ordered = sorted(self.window(samples))
+        if not ordered:
+            return tuple(0.0 for _ in points)
+        return tuple(
+            ordered[min(len(ordered) - 1, len(ordered) * p // 100)] / 1e6
+            for p in points
+        )
+
+    def summary(self):
+        lines = [f"{'phase':<20} {'p50':>7} {'p95':>7} {'p99':>7}  ms"]
+        rows = [("frame", self.frame_time)] + list(self.durations.items())
+        for phase, samples in rows:
+            p50, p95, p99 = self.percentiles(samples)
+            lines.append(f"{phase:<20} {p50:7.2f} {p95:7.2f} {p99:7.2f}")
+        over = sum(t > BUDGET_MS * 1e6 for t in self.window(self.frame_time))
+        lines.append(f"{over} of {min(self.count, self.frames)} frames over budget")
+        return "\n".join(lines)
+
+    def save_trace(self, path):
+        # Chrome trace-event JSON: one complete ("X") event per frame and per
+        # phase, timestamps in microseconds
+        events = []
+        first = max(0, self.count - self.frames)
+        for frame in range(first, self.count):
+            slot = frame % self.frames
+            start = self.frame_start[slot]
+            events.append(
+                {
+                    "name": "frame",
+                    "ph": "X",
+                    "ts": start / 1e3,
+                    "dur": self.frame_time[slot] / 1e3,
+                    "pid": 1,
+                    "tid": 1,
+                    "args": {"frame": frame},
+                }
+            )
+            for phase, durations in self.durations.items():
+                if durations[slot]:
+                    events.append(
+                        {
+                            "name": phase,
+                            "ph": "X",
+                            "ts": (start + self.starts[phase][slot]) / 1e3,
+                            "dur": durations[slot] / 1e3,
+                            "pid": 1,
+                            "tid": 1,
+                        }
+                    )
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class NullProfiler:
+    # Stands in when profiling is off, so the game loop needs no checks
+    count = 0  # No frames, so the F3 overlay stays empty
+
+    def start_frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def end_frame(self):
+        pass
@@ -0,0 +1,87 @@
+import os
+import random
+from collections import deque
+
+# No window: frames are drawn off screen. Set before pygame starts up.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from tetris import (
+    ACTIONS,
+    BG_COLOR,
+    GRAVITY,
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    TICK_RATE,
+    GameState,
+    draw_game_over,
+    draw_ghost_piece,
+    draw_grid_lines,
+    draw_piece,
+    draw_static,
+)
+
+# Frames for offline video rendering, drawn with the game's own draw
+# functions. The encoding side (ffmpeg or PNGs, the worker pool and the
+# command line) is shared with the Claude game and lives in the video
+# package at the top of the repository:
+#
+#   python -m video tetris-gemini-pro-25 videos/ *.replay
+
+
+def replay_frames(seed, events, fps):
+    # Replays the inputs tick by tick like main() and yields the screen
+    # every TICK_RATE / fps ticks, ending on the final board
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    state = GameState(random.Random(seed))
+    events = deque(events)
+
+    background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    background.fill(BG_COLOR)
+    draw_grid_lines(background)
+    static = background.copy()
+    static_version = None  # state.version the static layer shows
+    flash_alpha = 0
+    flashed = 0  # state.clears the flash has been shown for
+
+    tick = 0
+    running = True
+    while running:
+        for _ in range(TICK_RATE // fps):
+            gravity = False
+            while events and events[0][0] <= tick:
+                action = events.popleft()[1]
+                if action == GRAVITY:
+                    gravity = True
+                else:
+                    state.apply(ACTIONS[action])
+            if gravity:
+                state.fall()
+            tick += 1
+            running = bool(events)
+            if not running:
+                break
+
+        if state.version != static_version:
+            static_version = state.version
+            draw_static(static, background, state.grid, state.score, state.next_piece)
+        if state.clears != flashed:
+            flashed = state.clears
+            flash_alpha = 180
+        screen.blit(static, (0, 0))
+        if not state.game_over:
+            draw_ghost_piece(screen, state.current_piece, state.grid)
+            draw_piece(screen, state.current_piece)
+        if flash_alpha > 0:
+            flash_surface = pygame.Surface(
+                (SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA
+            )
+            flash_surface.fill((255, 255, 255, int(flash_alpha)))
+            screen.blit(flash_surface, (0, 0))
+            flash_alpha = max(0, flash_alpha - 250 / fps)
+        if state.game_over:
+            draw_game_over(screen, state.score)
+        yield screen
@@ -0,0 +1,84 @@
+import argparse
+import random
+import struct
+import time
+
+# Replay files: a header holding the session seed, then one 5-byte record per
+# input, the game tick it happened on and an action byte (see ACTIONS and
+# GRAVITY in tetris.py). Automatic falls are logged too, so playback does
+# not depend on frame timing.
+#
+#   python tetris.py --record game.replay    # play and record
+#   python tetris.py --replay game.replay    # watch it at real time
+#   python replay.py *.replay                # re-simulate at full speed
+
+MAGIC = b"GTRP"
+VERSION = 3  # 2 used the old rotation rules, 1 logged render frames
+HEADER = struct.Struct("<4sBq")
+EVENT = struct.Struct("<IB")
+
+
+def new_seed():
+    return random.randrange(-(2**63), 2**63)
+
+
+class Recorder:
+    def __init__(self, seed):
+        self.seed = seed
+        self.events = bytearray()
+
+    def record(self, tick, action):
+        self.events += EVENT.pack(tick, action)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed))
+            f.write(self.events)
+
+
+def load(path):
+    # -> (seed, [(tick, action), ...])
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} replay file")
+    return seed, list(EVENT.iter_unpack(data[HEADER.size :]))
+
+
+def play(seed, events):
+    # Re-simulates a recorded session headless, as fast as GameState allows.
+    # Events are in the order main() applied them, each tick's input before
+    # its automatic fall. Returns the final GameState.
+    from tetris import ACTIONS, GRAVITY, GameState  # tetris imports replay
+
+    state = GameState(random.Random(seed))
+    for _, action in events:
+        if action == GRAVITY:
+            state.fall()
+        else:
+            state.apply(ACTIONS[action])
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-simulate recorded games")
+    parser.add_argument("replays", nargs="+")
+    args = parser.parse_args()
+
+    steps = 0
+    start = time.perf_counter()
+    for path in args.replays:
+        seed, events = load(path)
+        state = play(seed, events)
+        steps += len(events)
+        print(
+            f"{path}: score {state.score}, lines {state.lines}"
+            + (", game over" if state.game_over else "")
+        )
+    elapsed = time.perf_counter() - start
+    print(f"{len(args.replays)} replays, {steps} steps in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from board import GUARD, TOP
+from tetris import (
+    GRID_HEIGHT,
+    GRID_WIDTH,
+    KICKS,
+    MIN_Y,
+    ORIENTATION_BITS,
+    ORIENTATIONS,
+)
+
+# Move generator: every distinct resting placement of a piece that the game
+# loop can reach, with the key actions that get it there. Actions are "left",
+# "right", "clockwise", "counter_clockwise", "down" (soft drop) and "drop".
+# Rotation follows Piece.rotate, including its SRS wall kicks.
+
+Placement = namedtuple("Placement", "x y coords cells actions")
+
+STRIDE = GRID_WIDTH + GUARD
+# Collision memo flags are indexed by (x, y, orientation); pivots plus wall
+# kicks can reach a few cells outside the board, hence X_OFFSET and the
+# spare rows. Rows above MIN_Y are never indexed: they are always blocked.
+X_OFFSET = 4
+X_RANGE = GRID_WIDTH + 2 * X_OFFSET
+STATES = X_RANGE * (GRID_HEIGHT - MIN_Y + 3) * 4
+
+
+def reachable_placements(piece, grid):
+    return _placements(grid.bits, piece.shape_name, piece.x, piece.y, piece.rotation)
+
+
+@lru_cache(maxsize=4096)
+def _placements(grid_bits, shape_name, x, y, orientation):
+    # Memoized per (board, piece, start state); grid_bits is BitBoard.bits
+    shapes = ORIENTATION_BITS[shape_name]
+    min_y = [-TOP - top for top, left, bits in shapes]  # As in Piece.rotate
+
+    # Collision results per (x, y, orientation): 0 untested, 1 free, 2 blocked.
+    # Translations and every kick test share it, so each state is checked once.
+    known = bytearray(STATES)
+
+    def blocked(x, y, orientation):
+        if y < min_y[orientation]:
+            return True
+        index = ((y - MIN_Y) * X_RANGE + x + X_OFFSET) * 4 + orientation
+        if not known[index]:
+            top, left, bits = shapes[orientation]
+            shift = (y + top + TOP) * STRIDE + GUARD + x + left
+            known[index] = 2 if grid_bits & (bits << shift) else 1
+        return known[index] == 2
+
+    def rotate(x, y, orientation, turn):
+        target = (orientation + turn) % 4
+        for dx, dy in KICKS[shape_name, orientation, target]:
+            if not blocked(x + dx, y + dy, target):
+                return x + dx, y + dy, target
+        return None
+
+    paths = {(x, y, orientation): ()}
+    queue = deque(paths)
+    while queue:
+        state = queue.popleft()
+        x, y, orientation = state
+        for action, moved in (
+            ("left", (x - 1, y, orientation)),
+            ("right", (x + 1, y, orientation)),
+            ("down", (x, y + 1, orientation)),
+            ("clockwise", rotate(x, y, orientation, 1)),
+            ("counter_clockwise", rotate(x, y, orientation, -1)),
+        ):
+            if moved is None or moved in paths or blocked(*moved):
+                continue
+            paths[moved] = paths[state] + (action,)
+            queue.append(moved)
+
+    # A hard drop from any state lands on the resting state below it. Walk
+    # states bottom-up so each one inherits the landing spot of the state
+    # under it, and keep the shortest action list per distinct set of cells
+    # (O, I, S and Z orientations repeat cells at different pivots).
+    landing = {}
+    best = {}
+    for state in sorted(paths, key=lambda state: -state[1]):
+        x, y, orientation = state
+        below = (x, y + 1, orientation)
+        target = landing[below] if below in paths else state
+        landing[state] = target
+        tx, ty, to = target
+        cells = frozenset((ty + r, tx + c) for r, c in ORIENTATIONS[shape_name][to])
+        path = paths[state] + ("drop",)
+        if cells not in best or len(path) < len(best[cells][1]):
+            best[cells] = (target, path)
+
+    return tuple(
+        Placement(x, y, ORIENTATIONS[shape_name][o], tuple(sorted(cells)), path)
+        for cells, ((x, y, o), path) in sorted(
+            best.items(), key=lambda item: item[1][0]
+        )
+    )
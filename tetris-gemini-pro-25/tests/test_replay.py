@@ -0,0 +1,40 @@
+import random
+
+from replay import Recorder, load, play
+from search import reachable_placements
+from tetris import ACTIONS, GRAVITY, TICK, GameState
+
+
+def test_round_trip(tmp_path):
+    # Records a session the way main() does, restarts included, then checks
+    # the headless player ends up in the same place
+    seed = 7
+    state = GameState(random.Random(seed))
+    recorder = Recorder(seed)
+    moves = random.Random(1)
+    for tick in range(20_000):
+        actions = []
+        if state.game_over:
+            actions = ["restart"]
+        elif moves.random() < 0.02:
+            # Every so often, place the piece as low as it can go
+            placements = reachable_placements(state.current_piece, state.grid)
+            if placements:
+                lowest = max(placements, key=lambda p: sum(r for r, c in p.cells))
+                actions = lowest.actions
+        elif moves.random() < 0.1:
+            actions = [moves.choice(ACTIONS[:-1])]
+        for action in actions:
+            recorder.record(tick, ACTIONS.index(action))
+            state.apply(action)
+        if state.tick(TICK):
+            recorder.record(tick, GRAVITY)
+    assert state.lines
+
+    path = tmp_path / "game.replay"
+    recorder.save(path)
+    replayed = play(*load(path))
+    assert replayed.score == state.score
+    assert replayed.lines == state.lines
+    assert replayed.game_over == state.game_over
+    assert replayed.grid == state.grid
@@ -0,0 +1,39 @@
+import pytest
+
+from transposition import TABLES, DepthTable, LRUTable
+
+
+@pytest.mark.parametrize("policy", sorted(TABLES))
+def test_shallow_result_keeps_deep_one(policy):
+    table = TABLES[policy](8)
+    table.put(1, 3, "deep")
+    table.put(1, 1, "shallow")
+    assert table.get(1, 3) == "deep"
+    table.put(1, 3, "same depth")
+    assert table.get(1) == "same depth"
+    table.put(1, 4, "deeper")
+    assert table.get(1, 4) == "deeper"
+    assert len(table) == 1
+
+
+def test_lru_evicts_least_recently_used():
+    table = LRUTable(2)
+    table.put(1, 0, "a")
+    table.put(2, 0, "b")
+    assert table.get(1) == "a"
+    table.put(3, 0, "c")
+    assert table.get(2) is None
+    assert (table.get(1), table.get(3)) == ("a", "c")
+    assert table.evictions == 1
+
+
+def test_depth_table_collisions_prefer_depth():
+    table = DepthTable(4)
+    table.put(1, 3, "deep")
+    table.put(5, 1, "shallow")  # Same slot
+    assert table.get(1) == "deep"
+    assert table.get(5) is None
+    table.put(5, 3, "as deep")
+    assert table.get(5) == "as deep"
+    assert table.get(1) is None
+    assert table.evictions == 1
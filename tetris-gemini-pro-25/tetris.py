@@ -1,5 +1,13 @@
+import argparse
+import copy
 import pygame
 import random
+from collections import deque
+from functools import lru_cache
+
+from board import GUARD, TOP, BitBoard, shape_bits, shape_bottom, zobrist_keys
+from profiler import BUDGET_MS, FrameProfiler, NullProfiler
+from replay import Recorder, load, new_seed
 
 # --- Constants ---
 # Screen dimensions
@@ -26,23 +34,122 @@ BLACK = (0, 0, 0)  # Empty cell color
 GRID_COLOR = (40, 40, 40)  # Dark grey for grid lines
 BG_COLOR = (10, 10, 25)  # Dark blue/purple background
 
-# Tetromino shapes and their colors (pivot is (0,0) in local coords (row, col))
+# Tetromino shapes and their colors (pivot is (0,0) in local coords (row, col)).
+# Shapes are in their SRS spawn orientation.
 TETROMINOES = {
     "I": {"shape": [(0, -1), (0, 0), (0, 1), (0, 2)], "color": (0, 220, 220)},  # Cyan
     "O": {"shape": [(0, 0), (1, 0), (0, 1), (1, 1)], "color": (220, 220, 0)},  # Yellow
     "T": {
-        "shape": [(0, 0), (-1, 0), (1, 0), (0, -1)],
+        "shape": [(-1, 0), (0, -1), (0, 0), (0, 1)],
         "color": (160, 0, 220),
     },  # Purple
-    "S": {"shape": [(0, 0), (1, 0), (0, 1), (-1, 1)], "color": (0, 220, 0)},  # Green
-    "Z": {"shape": [(0, 0), (-1, 0), (0, 1), (1, 1)], "color": (220, 0, 0)},  # Red
-    "J": {"shape": [(0, 0), (-1, 0), (0, -1), (0, -2)], "color": (0, 0, 220)},  # Blue
+    "S": {"shape": [(-1, 0), (-1, 1), (0, -1), (0, 0)], "color": (0, 220, 0)},  # Green
+    "Z": {"shape": [(-1, -1), (-1, 0), (0, 0), (0, 1)], "color": (220, 0, 0)},  # Red
+    "J": {"shape": [(-1, -1), (0, -1), (0, 0), (0, 1)], "color": (0, 0, 220)},  # Blue
     "L": {
-        "shape": [(0, 0), (1, 0), (0, -1), (0, -2)],
+        "shape": [(-1, 1), (0, -1), (0, 0), (0, 1)],
         "color": (220, 120, 0),
     },  # Orange
 }
 
+# Board cells store 1-based piece ids, PALETTE resolves them to colors
+PIECE_IDS = {name: i + 1 for i, name in enumerate(TETROMINOES)}
+PALETTE = [BLACK] + [tetromino["color"] for tetromino in TETROMINOES.values()]
+
+
+# --- Rotation ---
+# Rotation states 0-3 are spawn, clockwise, 180 and counter-clockwise. The I
+# and O pieces turn about the point between their middle cells (given
+# doubled, as (1, 1)), the others about their (0, 0) cell.
+ROTATION_CENTERS = {"I": (1, 1), "O": (1, 1)}
+TURNS = {"clockwise": 1, "counter_clockwise": -1}
+
+
+def rotate_clockwise(coords, center):
+    # (r, c) -> (c, -r) about the doubled center
+    cr, cc = center
+    return tuple(((2 * c - cc + cr) // 2, (cr + cc - 2 * r) // 2) for r, c in coords)
+
+
+def orientations(shape_name):
+    coords = tuple(TETROMINOES[shape_name]["shape"])
+    center = ROTATION_CENTERS.get(shape_name, (0, 0))
+    states = []
+    for _ in range(4):
+        states.append(coords)
+        coords = rotate_clockwise(coords, center)
+    return tuple(states)
+
+
+# ORIENTATIONS[shape_name][rotation] -> (row, col) offsets, and the
+# shape_bits() of each for collision tests
+ORIENTATIONS = {name: orientations(name) for name in TETROMINOES}
+ORIENTATION_BITS = {
+    name: tuple(shape_bits(coords, GRID_WIDTH) for coords in states)
+    for name, states in ORIENTATIONS.items()
+}
+
+# Cells may poke up into the TOP spare rows the grid keeps above itself but
+# no higher: there is nothing to test them against there, so moves and
+# kicks that would go further count as blocked. A pivot row is in range
+# when y >= -TOP - top; MIN_Y is the highest row any orientation allows.
+MIN_Y = -TOP - max(top for states in ORIENTATION_BITS.values() for top, _, _ in states)
+
+# The packed bits again, with the (top, left) offset folded into one shift:
+# the piece with its pivot at (x, y) is bits << ((y + TOP) * STRIDE + x +
+# offset), so a collision test needs no coordinates, and the lowest y the
+# orientation allows. shape_bottom() of each orientation is for
+# BitBoard.drop_distance().
+STRIDE = GRID_WIDTH + GUARD
+ORIENTATION_MASKS = {
+    name: tuple(
+        (bits, top * STRIDE + GUARD + left, -TOP - top) for top, left, bits in states
+    )
+    for name, states in ORIENTATION_BITS.items()
+}
+ORIENTATION_BOTTOMS = {
+    name: tuple(shape_bottom(coords) for coords in states)
+    for name, states in ORIENTATIONS.items()
+}
+
+# SRS wall kicks per (from, to) rotation, as (x, y) with y pointing up like
+# the published tables. Each rotation tries its tests in order.
+JLSTZ_KICKS = {
+    (0, 1): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],
+    (1, 0): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],
+    (1, 2): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],
+    (2, 1): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],
+    (2, 3): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],
+    (3, 2): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],
+    (3, 0): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],
+    (0, 3): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],
+}
+I_KICKS = {
+    (0, 1): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],
+    (1, 0): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],
+    (1, 2): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)],
+    (2, 1): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],
+    (2, 3): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],
+    (3, 2): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],
+    (3, 0): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],
+    (0, 3): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)],
+}
+O_KICKS = {turn: [(0, 0)] for turn in JLSTZ_KICKS}  # O only turns in place
+
+KICK_TABLES = {"I": I_KICKS, "O": O_KICKS}
+
+
+def kicks():
+    # (shape_name, from, to) -> (dx, dy) grid offsets to test, rows down
+    table = {}
+    for name in TETROMINOES:
+        for (start, end), tests in KICK_TABLES.get(name, JLSTZ_KICKS).items():
+            table[name, start, end] = tuple((x, -y) for x, y in tests)
+    return table
+
+
+KICKS = kicks()
+
 
 # --- Piece Class ---
 class Piece:
@@ -52,100 +159,93 @@ class Piece:
         self.shape_name = shape_name
         self.shape_template = TETROMINOES[shape_name]["shape"]
         self.color = TETROMINOES[shape_name]["color"]
-        self.current_shape_coords = list(
-            self.shape_template
-        )  # Rotated (row_offset, col_offset)
-
-    def get_rotated_coords(self, shape_coords, direction):
-        rotated = []
-        for r_offset, c_offset in shape_coords:
-            if direction == "clockwise":  # (r, c) -> (c, -r)
-                rotated.append((c_offset, -r_offset))
-            elif direction == "counter_clockwise":  # (r, c) -> (-c, r)
-                rotated.append((-c_offset, r_offset))
-        return rotated
-
-    def rotate(self, direction, grid):
-        prospective_coords = self.get_rotated_coords(
-            self.current_shape_coords, direction
-        )
-        if self.is_valid_position(prospective_coords, self.x, self.y, grid):
-            self.current_shape_coords = prospective_coords
-            return True
-
-        # Basic wall kick: try moving 1 unit left/right if rotation failed
-        # This is a very simplified wall kick, not full SRS
-        for dx_kick in [-1, 1, -2, 2]:  # Try moving horizontally
-            if self.is_valid_position(
-                prospective_coords, self.x + dx_kick, self.y, grid
-            ):
-                self.x += dx_kick
-                self.current_shape_coords = prospective_coords
+        self.piece_id = PIECE_IDS[shape_name]
+        self.rotation = 0
+        # (row_offset, col_offset) of each block in the current rotation
+        self.current_shape_coords = ORIENTATIONS[shape_name][0]
+        # Its ORIENTATION_MASKS entry, for is_valid_position()
+        self.bits, self.offset, self.min_y = ORIENTATION_MASKS[shape_name][0]
+
+    def rotate(self, turn, grid):
+        # turn is 1 for clockwise, -1 for counter-clockwise. The first free
+        # SRS kick wins.
+        rotation = (self.rotation + turn) % 4
+        top, left, bits = ORIENTATION_BITS[self.shape_name][rotation]
+        for dx, dy in KICKS[self.shape_name, self.rotation, rotation]:
+            if self.y + dy + top < -TOP:
+                continue  # Above the grid's spare rows (see MIN_Y)
+            if not grid.collides(bits, self.x + dx + left, self.y + dy + top):
+                self.x += dx
+                self.y += dy
+                self.rotation = rotation
+                self.current_shape_coords = ORIENTATIONS[self.shape_name][rotation]
+                masks = ORIENTATION_MASKS[self.shape_name][rotation]
+                self.bits, self.offset, self.min_y = masks
                 return True
         return False
 
-    def is_valid_position(self, shape_coords_to_check, piece_x, piece_y, grid):
-        for r_offset, c_offset in shape_coords_to_check:
-            r_world, c_world = piece_y + r_offset, piece_x + c_offset
-
-            if not (0 <= c_world < GRID_WIDTH):  # Check horizontal bounds
-                return False
-            if r_world >= GRID_HEIGHT:  # Check vertical bottom bound
-                return False
-            # Only check for collision if the block is within the grid's top boundary
-            if (
-                r_world >= 0 and grid[r_world][c_world] != BLACK
-            ):  # Check collision with locked pieces
-                return False
-        return True
+    def is_valid_position(self, piece_x, piece_y, grid):
+        # Current orientation with its pivot at (piece_x, piece_y): one shift
+        # and AND against the grid's packed bits
+        return piece_y >= self.min_y and not grid.bits & self.bits << (
+            (piece_y + TOP) * STRIDE + piece_x + self.offset
+        )
 
 
 # --- Game Functions ---
 def create_grid():
-    return [[BLACK for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+    return BitBoard(GRID_WIDTH, GRID_HEIGHT)
 
 
-def new_piece():
-    shape_name = random.choice(list(TETROMINOES.keys()))
+def new_piece(rng=random):
+    # rng can be a seeded random.Random for reproducible piece sequences
+    shape_name = rng.choice(list(TETROMINOES.keys()))
     # Start piece with its pivot at y=1 (second row from top, index 1)
     # x is middle of the grid
     return Piece(x=GRID_WIDTH // 2, y=1, shape_name=shape_name)
 
 
 def lock_piece(grid, piece):
+    cells = []
     for r_offset, c_offset in piece.current_shape_coords:
         r, c = piece.y + r_offset, piece.x + c_offset
         if 0 <= r < GRID_HEIGHT and 0 <= c < GRID_WIDTH:  # Ensure locking within bounds
-            grid[r][c] = piece.color
+            cells.append((r, c))
+    grid.place(cells, piece.piece_id)
 
 
 def clear_lines(grid):
-    lines_cleared = 0
-    new_grid_rows = []  # Store rows that are not cleared from bottom up
+    full_rows = grid.full_rows()
+    if full_rows:
+        grid.clear_rows(full_rows)
+    return len(full_rows)
 
-    for r in range(GRID_HEIGHT - 1, -1, -1):  # Iterate from bottom row upwards
-        is_full = True
-        for c in range(GRID_WIDTH):
-            if grid[r][c] == BLACK:
-                is_full = False
-                break
 
-        if is_full:
-            lines_cleared += 1
-            # This row will not be added to new_grid_rows, effectively removing it
-        else:
-            new_grid_rows.append(list(grid[r]))  # Keep the non-full row
+def drop_distance(piece, grid):
+    # Rows the piece can fall. The column heights answer this directly
+    # unless the piece has been slid under an overhang; then the piece's
+    # packed bits are shifted down a row at a time.
+    bottom = ORIENTATION_BOTTOMS[piece.shape_name][piece.rotation]
+    distance = grid.drop_distance(bottom, piece.x, piece.y)
+    if distance is None:
+        bits = grid.bits
+        mask = piece.bits << ((piece.y + TOP) * STRIDE + piece.x + piece.offset)
+        distance = 0
+        while not bits & mask << STRIDE:
+            mask <<= STRIDE
+            distance += 1
+    return distance
 
-    # Add empty rows at the top for each cleared line
-    num_new_empty_rows = GRID_HEIGHT - len(new_grid_rows)
-    for _ in range(num_new_empty_rows):
-        new_grid_rows.append([BLACK for _ in range(GRID_WIDTH)])
 
-    # Update the grid with the new arrangement (new_grid_rows is bottom-up, so reverse it)
-    for r_idx, row_content in enumerate(reversed(new_grid_rows)):
-        grid[r_idx] = row_content
+ghost_cache = {}  # Ghost row for the last (board, shape, x, y) drawn
 
-    return lines_cleared
+
+def ghost_row(piece, grid):
+    key = (grid.bits, piece.shape_name, piece.rotation, piece.x, piece.y)
+    if key not in ghost_cache:
+        ghost_cache.clear()
+        ghost_cache[key] = piece.y + drop_distance(piece, grid)
+    return ghost_cache[key]
 
 
 def calculate_score(lines):
@@ -160,7 +260,208 @@ def calculate_score(lines):
     return 0
 
 
+# --- Game State ---
+# Player actions, in replay file byte order (see REPLAY_KEYS)
+ACTIONS = ("left", "right", "clockwise", "counter_clockwise", "down", "drop", "restart")
+INITIAL_FALL_SPEED = 0.4  # Seconds per automatic drop
+LEVEL_THRESHOLD = 500  # Score to increase speed
+
+# Zobrist keys for GameState.position_key(): the falling piece's state, with
+# room for kicks past the edges, and the next piece
+PIECE_KEYS = zobrist_keys(
+    "piece",
+    (
+        (shape_name, rotation, x, y)
+        for shape_name in TETROMINOES
+        for rotation in range(4)
+        for x in range(-4, GRID_WIDTH + 4)
+        for y in range(MIN_Y, GRID_HEIGHT + 4)
+    ),
+)
+NEXT_KEYS = zobrist_keys("next", TETROMINOES)
+
+
+class GameState:
+    # Everything the game logic works on. apply() takes player actions,
+    # tick() advances time and fall() is one automatic drop. snapshot() and
+    # restore() copy the board buffers and a few scalars, so search and
+    # rollback never deep-copy the game.
+    def __init__(self, rng=random):
+        self.rng = rng  # Draws the piece sequence
+        self.version = 0  # Bumped when the board, score or next piece change
+        self.clears = 0  # Line clears so far, for the screen flash
+        self.reset()
+
+    def reset(self):
+        self.grid = create_grid()
+        self.current_piece = new_piece(self.rng)
+        self.next_piece = new_piece(self.rng)
+        self.score = 0
+        self.lines = 0  # Lines cleared this game
+        self.game_over = False
+        self.fall_timer = 0
+        self.fall_speed = INITIAL_FALL_SPEED
+        self.version += 1
+
+    def snapshot(self):
+        # Pieces swap in a new coordinate list when they rotate, so shallow
+        # copies are independent
+        return (
+            self.grid.copy(),
+            copy.copy(self.current_piece),
+            copy.copy(self.next_piece),
+            self.score,
+            self.lines,
+            self.game_over,
+            self.fall_timer,
+            self.fall_speed,
+            self.rng.getstate(),
+        )
+
+    def restore(self, snapshot):
+        # A snapshot can be restored any number of times
+        grid, current_piece, next_piece, *rest = snapshot
+        self.grid = grid.copy()
+        self.current_piece = copy.copy(current_piece)
+        self.next_piece = copy.copy(next_piece)
+        (
+            self.score,
+            self.lines,
+            self.game_over,
+            self.fall_timer,
+            self.fall_speed,
+            rng_state,
+        ) = rest
+        self.rng.setstate(rng_state)
+        self.version += 1
+
+    def position_key(self):
+        # 64-bit key of the grid, falling piece and next piece for
+        # transposition tables. The grid keeps its part up to date itself.
+        piece = self.current_piece
+        return (
+            self.grid.key
+            ^ PIECE_KEYS[piece.shape_name, piece.rotation, piece.x, piece.y]
+            ^ NEXT_KEYS[self.next_piece.shape_name]
+        )
+
+    def move(self, dx, dy):
+        piece = self.current_piece
+        if not piece.is_valid_position(piece.x + dx, piece.y + dy, self.grid):
+            return False
+        piece.x += dx
+        piece.y += dy
+        return True
+
+    def apply(self, action):
+        # One of ACTIONS; once the game is over only "restart" does anything
+        if self.game_over:
+            if action == "restart":
+                self.reset()
+        elif action == "left":
+            self.move(-1, 0)
+        elif action == "right":
+            self.move(1, 0)
+        elif action in ("clockwise", "counter_clockwise"):
+            self.current_piece.rotate(TURNS[action], self.grid)
+        elif action == "down":  # Soft drop
+            if self.move(0, 1):
+                self.score += 1  # Small score bonus for soft drop
+                self.version += 1
+                self.fall_timer = 0  # Reset auto-fall timer
+        elif action == "drop":  # Hard drop
+            distance = drop_distance(self.current_piece, self.grid)
+            self.current_piece.y += distance
+            self.score += distance * 2  # Score bonus for hard drop
+            self.lock()
+            self.fall_timer = 0
+
+    def tick(self, dt):
+        # Advances the fall timer by dt seconds; True when the piece fell.
+        # The remainder carries over so the fall rate stays exact.
+        if self.game_over:
+            return False
+        self.fall_timer += dt
+        if self.fall_timer < self.fall_speed:
+            return False
+        self.fall_timer -= self.fall_speed
+        self.fall()
+        return True
+
+    def fall(self):
+        if not self.game_over and not self.move(0, 1):
+            self.lock()  # Piece has landed
+
+    def lock(self):
+        lock_piece(self.grid, self.current_piece)
+        lines_cleared = clear_lines(self.grid)
+        if lines_cleared > 0:
+            self.lines += lines_cleared
+            score_increase = calculate_score(lines_cleared)
+            self.score += score_increase
+            self.clears += 1
+
+            # Speed up by 10% (to at most 0.1s a row) on each new level
+            current_level = self.score // LEVEL_THRESHOLD
+            previous_level = (self.score - score_increase) // LEVEL_THRESHOLD
+            if current_level > previous_level:
+                self.fall_speed = max(0.1, self.fall_speed * 0.9)
+
+        self.current_piece = self.next_piece
+        self.next_piece = new_piece(self.rng)
+        self.version += 1
+        # Check if the new piece spawns in a valid position
+        piece = self.current_piece
+        if not piece.is_valid_position(piece.x, piece.y, self.grid):
+            self.game_over = True
+
+
+# --- Text Cache ---
+@lru_cache(maxsize=None)
+def get_font(name, size, bold=False):
+    # SysFont scans the installed fonts, so each font is loaded only once
+    return pygame.font.SysFont(name, size, bold=bold)
+
+
+@lru_cache(maxsize=256)
+def render_text(font, text, color):
+    # Labels are re-rendered only when their text (e.g. the score) changes
+    return font.render(text, 1, color)
+
+
 # --- Drawing Functions ---
+block_sprites = {}  # (color, is_ghost) -> pre-rendered block surface
+
+
+def block_sprite(color, is_ghost=False):
+    # Blocks are rendered once per color and style in display format, so
+    # drawing one is a single blit
+    sprite = block_sprites.get((color, is_ghost))
+    if sprite is None:
+        rect = (0, 0, BLOCK_SIZE, BLOCK_SIZE)
+        if is_ghost:
+            # Ghost piece is semi-transparent main color
+            sprite = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE), pygame.SRCALPHA)
+            sprite.fill((color[0], color[1], color[2], 80))  # Alpha = 80
+            # Faint (darker) opaque border for the ghost
+            border_color = (color[0] // 2, color[1] // 2, color[2] // 2)
+            pygame.draw.rect(sprite, border_color, rect, 1)
+            sprite = sprite.convert_alpha()
+        else:
+            sprite = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE))
+            sprite.fill(color)
+            # Darker border for 3D effect
+            border_color = (
+                max(0, color[0] - 50),
+                max(0, color[1] - 50),
+                max(0, color[2] - 50),
+            )
+            pygame.draw.rect(sprite, border_color, rect, 3)
+            sprite = sprite.convert()
+        block_sprites[(color, is_ghost)] = sprite
+    return sprite
+
+
 def draw_grid_lines(surface):
     for r in range(GRID_HEIGHT + 1):
         pygame.draw.line(
@@ -179,37 +480,21 @@ def draw_grid_lines(surface):
 
 
 def draw_locked_blocks(surface, grid):
+    blits = []
     for r in range(GRID_HEIGHT):
         for c in range(GRID_WIDTH):
-            if grid[r][c] != BLACK:
-                block_color = grid[r][c]
-                rect = (
-                    TOP_LEFT_X + c * BLOCK_SIZE,
-                    TOP_LEFT_Y + r * BLOCK_SIZE,
-                    BLOCK_SIZE,
-                    BLOCK_SIZE,
-                )
-                pygame.draw.rect(surface, block_color, rect)
-                # Darker border for 3D effect
-                border_color = (
-                    max(0, block_color[0] - 50),
-                    max(0, block_color[1] - 50),
-                    max(0, block_color[2] - 50),
-                )
-                pygame.draw.rect(surface, border_color, rect, 3)
+            piece_id = grid.get(r, c)
+            if piece_id:
+                position = (TOP_LEFT_X + c * BLOCK_SIZE, TOP_LEFT_Y + r * BLOCK_SIZE)
+                blits.append((block_sprite(PALETTE[piece_id]), position))
+    surface.blits(blits, doreturn=False)
 
 
 def draw_piece(
     surface, piece, offset_x=0, offset_y=0, custom_color=None, is_ghost=False
 ):
-    actual_color = custom_color if custom_color else piece.color
-    if is_ghost:
-        # Ghost piece is semi-transparent main color
-        ghost_surface = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE), pygame.SRCALPHA)
-        ghost_surface.fill(
-            (actual_color[0], actual_color[1], actual_color[2], 80)
-        )  # Alpha = 80
-
+    sprite = block_sprite(custom_color if custom_color else piece.color, is_ghost)
+    rects = []
     for r_offset, c_offset in piece.current_shape_coords:
         # piece.y and piece.x are grid coordinates of the pivot
         # r_offset and c_offset are relative to the pivot
@@ -220,32 +505,10 @@ def draw_piece(
         if r_world_grid >= 0:
             block_render_x = TOP_LEFT_X + c_world_grid * BLOCK_SIZE + offset_x
             block_render_y = TOP_LEFT_Y + r_world_grid * BLOCK_SIZE + offset_y
+            rects.append((block_render_x, block_render_y, BLOCK_SIZE, BLOCK_SIZE))
 
-            rect = (block_render_x, block_render_y, BLOCK_SIZE, BLOCK_SIZE)
-
-            if is_ghost:
-                surface.blit(ghost_surface, (block_render_x, block_render_y))
-                # Optionally, draw a faint border for the ghost
-                pygame.draw.rect(
-                    surface,
-                    (
-                        actual_color[0] // 2,
-                        actual_color[1] // 2,
-                        actual_color[2] // 2,
-                        100,
-                    ),
-                    rect,
-                    1,
-                )
-
-            else:
-                pygame.draw.rect(surface, actual_color, rect)
-                border_color = (
-                    max(0, actual_color[0] - 50),
-                    max(0, actual_color[1] - 50),
-                    max(0, actual_color[2] - 50),
-                )
-                pygame.draw.rect(surface, border_color, rect, 3)
+    surface.blits([(sprite, rect) for rect in rects], doreturn=False)
+    return rects
 
 
 def draw_ghost_piece(surface, piece, grid):
@@ -255,25 +518,50 @@ def draw_ghost_piece(surface, piece, grid):
     )  # Match current piece's rotation
 
     # Move ghost down until it hits something or bottom
-    while ghost.is_valid_position(
-        ghost.current_shape_coords, ghost.x, ghost.y + 1, grid
-    ):
-        ghost.y += 1
+    ghost.y = ghost_row(piece, grid)
+
+    return draw_piece(surface, ghost, is_ghost=True)
+
 
-    draw_piece(surface, ghost, is_ghost=True)
+def draw_static(
+    surface, background, grid, score, next_piece_obj, profiler=NullProfiler()
+):
+    # Everything that only changes when a piece locks or the score changes
+    surface.blit(background, (0, 0))
+    profiler.mark("draw_grid_lines")
+    draw_locked_blocks(surface, grid)
+    profiler.mark("draw_locked_blocks")
+    draw_ui(surface, score, next_piece_obj)
+    profiler.mark("draw_ui")
+
+
+def draw_profile(surface, profiler):
+    # Last frame's time, the p99 frame time and the slowest phase
+    frame_ms, phase, phase_ms = profiler.last_frame()
+    p99 = profiler.percentiles(profiler.frame_time, (99,))[0]
+    font = get_font("Consolas", 14)
+    text = font.render(
+        f"frame {frame_ms:5.1f} ms  p99 {p99:5.1f}  {phase} {phase_ms:5.1f}",
+        1,
+        (255, 80, 80) if frame_ms > BUDGET_MS else (200, 255, 200),
+    )
+    rect = text.get_rect(topleft=(4, 4)).inflate(8, 4)
+    surface.fill(BLACK, rect)
+    surface.blit(text, (6, 6))
+    return rect
 
 
 def draw_ui(surface, score, next_piece_obj):
     ui_panel_start_x = TOP_LEFT_X + PLAY_WIDTH + UI_MARGIN
 
     # Score
-    font_score = pygame.font.SysFont("Consolas", 30, bold=True)
-    score_label = font_score.render(f"Score: {score}", 1, WHITE)
+    font_score = get_font("Consolas", 30, bold=True)
+    score_label = render_text(font_score, f"Score: {score}", WHITE)
     surface.blit(score_label, (ui_panel_start_x, TOP_LEFT_Y + 50))
 
     # Next Piece
-    font_next = pygame.font.SysFont("Consolas", 24, bold=True)
-    next_label = font_next.render("Next:", 1, WHITE)
+    font_next = get_font("Consolas", 24, bold=True)
+    next_label = render_text(font_next, "Next:", WHITE)
     next_area_y = TOP_LEFT_Y + 120  # Y position for the "Next:" label
     surface.blit(next_label, (ui_panel_start_x, next_area_y - 30))
 
@@ -320,15 +608,15 @@ def draw_ui(surface, score, next_piece_obj):
 
 
 def draw_game_over(surface, score):
-    font_large = pygame.font.SysFont("Impact", 60)  # Slightly smaller for more text
-    font_medium = pygame.font.SysFont("Arial", 35, bold=True)
-    font_small = pygame.font.SysFont("Arial", 28)
+    font_large = get_font("Impact", 60)  # Slightly smaller for more text
+    font_medium = get_font("Arial", 35, bold=True)
+    font_small = get_font("Arial", 28)
     padding_between_texts = 20
 
-    game_text = font_large.render("GAME", 1, (200, 0, 0))
-    over_text = font_large.render("OVER", 1, (200, 0, 0))
-    final_score_text = font_medium.render(f"Final Score: {score}", 1, WHITE)
-    restart_text = font_small.render("Press R to Restart", 1, WHITE)
+    game_text = render_text(font_large, "GAME", (200, 0, 0))
+    over_text = render_text(font_large, "OVER", (200, 0, 0))
+    final_score_text = render_text(font_medium, f"Final Score: {score}", WHITE)
+    restart_text = render_text(font_small, "Press R to Restart", WHITE)
 
     # Calculate total height of the text block for centering
     texts = [game_text, over_text, final_score_text, restart_text]
@@ -363,156 +651,206 @@ def draw_game_over(surface, score):
     )
 
 
+def draw_paused(surface):
+    font_large = get_font("Impact", 60)
+    font_small = get_font("Arial", 28)
+    paused_text = render_text(font_large, "PAUSED", WHITE)
+    resume_text = render_text(font_small, "Press P to Resume", WHITE)
+
+    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 180))  # Black with alpha
+    surface.blit(overlay, (0, 0))
+
+    current_y = (
+        SCREEN_HEIGHT / 2
+        - (paused_text.get_height() + 20 + resume_text.get_height()) / 2
+    )
+    surface.blit(
+        paused_text, (SCREEN_WIDTH / 2 - paused_text.get_width() / 2, current_y)
+    )
+    current_y += paused_text.get_height() + 20
+    surface.blit(
+        resume_text, (SCREEN_WIDTH / 2 - resume_text.get_width() / 2, current_y)
+    )
+
+
+# --- Timing ---
+# The game logic advances in fixed ticks, independent of the frame rate.
+# Each rendered frame runs however many ticks of real time have passed, up
+# to MAX_CATCH_UP; lag beyond that is dropped, so a stall slows the game
+# down instead of fast-forwarding it. Frames show the last tick as is, with
+# no interpolation: pieces only ever sit on whole cells, and the one effect
+# in between, the line clear flash, already fades by frame time.
+TICK_RATE = 120  # Hz
+TICK = 1 / TICK_RATE  # Seconds
+MAX_CATCH_UP = 8
+BACKGROUND_FPS = TICK_RATE // MAX_CATCH_UP  # Slowest rate the game keeps up at
+PROFILE_EVERY = 15  # Frames between profiler overlay refreshes
+
+
+# --- Replays ---
+# Action bytes in replay files: an index into ACTIONS, or GRAVITY for an
+# automatic fall. REPLAY_KEYS[i] is the key for ACTIONS[i].
+REPLAY_KEYS = (
+    pygame.K_j,
+    pygame.K_l,
+    pygame.K_k,
+    pygame.K_i,
+    pygame.K_DOWN,
+    pygame.K_SPACE,
+    pygame.K_r,
+)
+KEY_ACTIONS = dict(zip(REPLAY_KEYS, ACTIONS))
+GRAVITY = len(ACTIONS)
+PAUSE_KEY = pygame.K_p  # Not recorded: a replay plays through pauses
+
+
 # --- Main Game Loop ---
-def main():
+def main(seed=None, record=None, events=None, profiler=None, fps=60, vsync=False):
+    # seed: piece sequence seed; record: path to save the session's inputs to;
+    # events: a recorded (tick, action) log to play instead of live input;
+    # profiler: a FrameProfiler to time each phase with (F3 toggles overlay);
+    # fps: render rate cap, 0 for uncapped; vsync: sync to the display
     pygame.init()
     pygame.font.init()  # Initialize font module
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    screen = pygame.display.set_mode(
+        (SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED if vsync else 0, vsync=vsync
+    )
     pygame.display.set_caption("Flashy Tetris")
     clock = pygame.time.Clock()
 
-    grid = create_grid()
-    current_piece = new_piece()
-    next_piece = new_piece()
-    score = 0
-    game_over = False
-
-    fall_timer = 0
-    fall_speed = 0.4  # Seconds per automatic drop
-    level_threshold = 500  # Score to increase speed
-    initial_fall_speed = 0.4  # Store initial speed for reset
+    if seed is None:
+        seed = new_seed()
+    state = GameState(random.Random(seed))
+    recorder = Recorder(seed) if record else None
+    replaying = events is not None
+    events = deque(events or ())
+    tick = 0
+    lag = 0.0  # Real time not yet simulated, seconds
+    actions = []  # Key presses waiting for the next tick
+    show_profile = profiler is not None
+    profiler = profiler or NullProfiler()
 
     flash_alpha = 0  # For line clear screen flash
-
+    flashed = 0  # state.clears the flash has been shown for
+
+    # Dirty-rectangle rendering: the grid lines never change, and the locked
+    # blocks and UI only change when a piece locks or the score changes, so
+    # they are cached on `static`. Between those events only the cells under
+    # the falling piece and its ghost are restored and redrawn.
+    background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    background.fill(BG_COLOR)
+    draw_grid_lines(background)
+    static = background.copy()
+    static_dirty = True
+    dirty_rects = []
+    static_version = 0  # state.version the static layer shows
+    drawn_scene = None  # What the frame on screen shows of the moving parts
+
+    paused = False
+    focused = True
     running = True
     while running:
-        dt = clock.tick(60) / 1000.0  # Delta time in seconds, target 60 FPS
+        # Unfocused windows render just fast enough for the simulation
+        dt = clock.tick(fps if focused else BACKGROUND_FPS) / 1000.0  # Seconds
+        lag = min(lag + dt, MAX_CATCH_UP * TICK)
+        profiler.start_frame()
 
         # --- Event Handling ---
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-            if event.type == pygame.KEYDOWN:
-                if game_over:
-                    if event.key == pygame.K_r:  # Restart game
-                        grid = create_grid()
-                        current_piece = new_piece()
-                        next_piece = new_piece()
-                        score = 0
-                        game_over = False
-                        fall_timer = 0
-                        fall_speed = initial_fall_speed  # Reset fall speed
-                        flash_alpha = 0
-                else:  # Game is active
-                    if event.key == pygame.K_j:  # Move Left
-                        if current_piece.is_valid_position(
-                            current_piece.current_shape_coords,
-                            current_piece.x - 1,
-                            current_piece.y,
-                            grid,
-                        ):
-                            current_piece.x -= 1
-                    elif event.key == pygame.K_l:  # Move Right
-                        if current_piece.is_valid_position(
-                            current_piece.current_shape_coords,
-                            current_piece.x + 1,
-                            current_piece.y,
-                            grid,
-                        ):
-                            current_piece.x += 1
-                    elif event.key == pygame.K_k:  # Rotate Clockwise
-                        current_piece.rotate("clockwise", grid)
-                    elif event.key == pygame.K_i:  # Rotate Counter-Clockwise
-                        current_piece.rotate("counter_clockwise", grid)
-                    elif event.key == pygame.K_DOWN:  # Soft drop
-                        if current_piece.is_valid_position(
-                            current_piece.current_shape_coords,
-                            current_piece.x,
-                            current_piece.y + 1,
-                            grid,
-                        ):
-                            current_piece.y += 1
-                            score += 1  # Small score bonus for soft drop
-                            fall_timer = 0  # Reset auto-fall timer
-                    elif event.key == pygame.K_SPACE:  # Hard Drop
-                        drop_distance = 0
-                        while current_piece.is_valid_position(
-                            current_piece.current_shape_coords,
-                            current_piece.x,
-                            current_piece.y + 1,
-                            grid,
-                        ):
-                            current_piece.y += 1
-                            drop_distance += 1
-                        score += drop_distance * 2  # Score bonus for hard drop
-
-                        # Lock piece immediately after hard drop
-                        lock_piece(grid, current_piece)
-                        lines_cleared = clear_lines(grid)
-                        if lines_cleared > 0:
-                            score += calculate_score(lines_cleared)
-                            flash_alpha = 180  # Trigger screen flash
-                        current_piece = next_piece
-                        next_piece = new_piece()
-                        if not current_piece.is_valid_position(
-                            current_piece.current_shape_coords,
-                            current_piece.x,
-                            current_piece.y,
-                            grid,
-                        ):
-                            game_over = True
-                        fall_timer = 0  # Reset fall timer
+            if event.type == pygame.WINDOWFOCUSLOST:
+                focused = False
+            if event.type == pygame.WINDOWFOCUSGAINED:
+                focused = True
+            if event.type == pygame.KEYDOWN and event.key == PAUSE_KEY:
+                paused = not paused
+                static_dirty = True  # Draw or clear the overlay
+                lag = 0.0  # The paused time is not simulated
+            elif event.type == pygame.KEYDOWN and event.key in KEY_ACTIONS:
+                if not paused:
+                    actions.append(KEY_ACTIONS[event.key])
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_profile = not show_profile
+                drawn_scene = None  # Redraw with or without it
+
+        profiler.mark("events")
 
         # --- Game Logic ---
-        if not game_over:
-            fall_timer += dt
-            if fall_timer >= fall_speed:
-                fall_timer = 0
-                if current_piece.is_valid_position(
-                    current_piece.current_shape_coords,
-                    current_piece.x,
-                    current_piece.y + 1,
-                    grid,
-                ):
-                    current_piece.y += 1
-                else:  # Piece has landed
-                    lock_piece(grid, current_piece)
-                    lines_cleared = clear_lines(grid)
-                    if lines_cleared > 0:
-                        score_increase = calculate_score(lines_cleared)
-                        score += score_increase
-                        flash_alpha = 180  # Trigger screen flash
-
-                        # Increase speed based on score (simple leveling)
-                        # Check if current score crosses a new level threshold
-                        current_level = score // level_threshold
-                        previous_level = (score - score_increase) // level_threshold
-                        if current_level > previous_level:
-                            fall_speed = max(
-                                0.1, fall_speed * 0.9
-                            )  # Decrease fall speed by 10%, min 0.1s
-
-                    current_piece = next_piece
-                    next_piece = new_piece()
-                    # Check if the new piece spawns in a valid position
-                    if not current_piece.is_valid_position(
-                        current_piece.current_shape_coords,
-                        current_piece.x,
-                        current_piece.y,
-                        grid,
-                    ):
-                        game_over = True
+        # Run the fixed ticks this frame's time covers; input waits for a tick
+        while lag >= TICK and not paused:
+            lag -= TICK
+            gravity = False
+            if replaying:
+                # Recorded input replaces the keyboard and the fall timer
+                actions = []
+                while events and events[0][0] <= tick:
+                    action = events.popleft()[1]
+                    if action == GRAVITY:
+                        gravity = True
+                    else:
+                        actions.append(ACTIONS[action])
+
+            for action in actions:
+                if recorder:
+                    recorder.record(tick, ACTIONS.index(action))
+                state.apply(action)
+            actions = []
+
+            if replaying:
+                if gravity:
+                    state.fall()
+            elif state.tick(TICK) and recorder:
+                recorder.record(tick, GRAVITY)
+            tick += 1
+
+        profiler.mark("logic")
+        grid, current_piece = state.grid, state.current_piece
+        if state.version != static_version:
+            static_version = state.version
+            static_dirty = True
+        if state.clears != flashed:
+            flashed = state.clears
+            flash_alpha = 180  # Trigger screen flash
 
         # --- Drawing ---
-        screen.fill(BG_COLOR)
-        draw_grid_lines(screen)
-        draw_locked_blocks(screen, grid)
-
-        if not game_over:
-            draw_ghost_piece(screen, current_piece, grid)
-            draw_piece(screen, current_piece)
+        # Full-screen overlays (flash, game over, pause) need the whole frame
+        # redrawn. Otherwise only the falling piece moves: skip the frame if
+        # it hasn't since the last one. The profiler overlay refreshes every
+        # PROFILE_EVERY frames, so profiling still sees the skipped ones.
+        full_redraw = static_dirty or flash_alpha > 0 or state.game_over or paused
+        overlay_due = show_profile and profiler.count % PROFILE_EVERY == 0
+        scene = (
+            current_piece,
+            current_piece.x,
+            current_piece.y,
+            tuple(current_piece.current_shape_coords),
+        )
+        if not (full_redraw or overlay_due) and scene == drawn_scene:
+            profiler.end_frame()
+            continue
+        drawn_scene = scene
+        if static_dirty:
+            draw_static(
+                static, background, grid, state.score, state.next_piece, profiler
+            )
+            static_dirty = False
 
-        draw_ui(screen, score, next_piece)
+        if full_redraw:
+            screen.blit(static, (0, 0))
+        else:
+            # Restore last frame's piece and ghost cells from the cached layer
+            for rect in dirty_rects:
+                screen.blit(static, rect, rect)
+        profiler.mark("restore")
+
+        rects = []
+        if not state.game_over:
+            rects += draw_ghost_piece(screen, current_piece, grid)
+            profiler.mark("draw_ghost_piece")
+            rects += draw_piece(screen, current_piece)
+            profiler.mark("draw_piece")
 
         # Screen flash effect
         if flash_alpha > 0:
@@ -526,14 +864,64 @@ def main():
             flash_alpha -= 250 * dt  # Fade out speed
             if flash_alpha < 0:
                 flash_alpha = 0
+                static_dirty = True  # One more full frame to clear the flash
 
-        if game_over:
-            draw_game_over(screen, score)  # Pass score to game over screen
+        if state.game_over:
+            draw_game_over(screen, state.score)  # Pass score to game over screen
+        elif paused:
+            draw_paused(screen)
+        profiler.mark("overlays")
 
-        pygame.display.flip()
+        if show_profile and profiler.count:
+            rects.append(draw_profile(screen, profiler))
 
+        if full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects + dirty_rects)
+        profiler.mark("display.flip")
+        profiler.end_frame()
+        dirty_rects = rects
+
+        # --- Idle ---
+        # A paused or finished game shows the same frame until input comes
+        # in: sleep on the event queue instead of redrawing it, and leave
+        # the time asleep unsimulated. Replays keep running to their end.
+        still = paused or (state.game_over and not events)
+        if still and not (flash_alpha or static_dirty):
+            pygame.event.post(pygame.event.wait())
+            clock.tick()
+
+    if recorder:
+        recorder.save(record)
     pygame.quit()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Flashy Tetris")
+    parser.add_argument("--seed", type=int, help="seed for the piece sequence")
+    parser.add_argument("--record", metavar="FILE", help="save the game's inputs")
+    parser.add_argument("--replay", metavar="FILE", help="watch a recorded game")
+    parser.add_argument(
+        "--fps", type=int, default=60, help="render rate cap, 0 for uncapped"
+    )
+    parser.add_argument("--vsync", action="store_true", help="sync to the display")
+    parser.add_argument(
+        "--profile", action="store_true", help="time each frame phase (F3 overlay)"
+    )
+    parser.add_argument(
+        "--trace", metavar="FILE", help="profile and save a Chrome trace on exit"
+    )
+    args = parser.parse_args()
+
+    profiler = FrameProfiler() if args.profile or args.trace else None
+    if args.replay:
+        seed, events = load(args.replay)
+        main(seed, None, events, profiler, args.fps, args.vsync)
+    else:
+        main(args.seed, args.record, None, profiler, args.fps, args.vsync)
+
+    if profiler:
+        print(profiler.summary())
+        if args.trace:
+            profiler.save_trace(args.trace)
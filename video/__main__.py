@@ -0,0 +1,76 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from video.encode import FORMATS, render_replay
+
+# Renders recorded games to video files offline, as fast as the drawing code
+# goes, one game per worker process. Each project's render.replay_frames()
+# plays a replay and draws it with the game's own code; the frames are piped
+# as raw pixels into ffmpeg, or saved as a PNG sequence, nothing in between.
+#
+#   python -m video tetris-claude-sonnet-4 videos/ *.replay        # MP4s
+#   python -m video tetris-gemini-pro-25 videos/ *.replay --format gif --fps 30
+#   python -m video tetris-claude-sonnet-4 frames/ game.replay --format png
+#
+# The project's directory goes first on sys.path (both have modules called
+# render, replay and tetris); spawned workers inherit it.
+
+ROOT = Path(__file__).resolve().parent.parent
+PROJECTS = ("tetris-claude-sonnet-4", "tetris-gemini-pro-25")
+
+
+def positive(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render replays to video")
+    parser.add_argument("project", choices=PROJECTS)
+    parser.add_argument("out_dir")
+    parser.add_argument("replays", nargs="+")
+    parser.add_argument("--format", choices=FORMATS, default="mp4")
+    parser.add_argument("--fps", type=positive, default=60)
+    parser.add_argument("--workers", type=positive, default=os.process_cpu_count())
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT / args.project))
+    from render import TICK_RATE
+
+    if TICK_RATE % args.fps:
+        parser.error(f"--fps must divide the {TICK_RATE} Hz tick rate")
+    if args.format != "png" and not shutil.which("ffmpeg"):
+        parser.error(f"{args.format} output needs ffmpeg on the PATH")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    frames = 0
+    start = time.perf_counter()
+    # Fresh interpreters rather than forks of this one: each worker starts
+    # its own pygame
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(args.workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(render_replay, path, args.out_dir, args.format, args.fps)
+            for path in args.replays
+        ]
+        for future in as_completed(futures):
+            output, count = future.result()
+            frames += count
+            print(f"{output}: {count} frames", flush=True)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(args.replays)} replays, {frames} frames in {elapsed:.2f}s "
+        f"({frames / elapsed:,.0f} frames/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
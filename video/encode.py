@@ -0,0 +1,87 @@
+import os
+import subprocess
+
+# No window: frames are drawn off screen. Set before pygame starts up.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+# Frame sinks and the per-replay worker for python -m video. Workers import
+# this module by name; the command line's own module can't be pickled.
+
+FORMATS = ("mp4", "gif", "png")
+FFMPEG_CODECS = {
+    "mp4": ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"],
+    "gif": ["-vf", "split[a][b];[a]palettegen[p];[b][p]paletteuse"],
+}
+END_HOLD = 2  # Seconds the final frame stays up
+
+
+class FFmpegWriter:
+    # Streams frames into an ffmpeg process through its stdin
+    def __init__(self, path, size, fps, codec):
+        self.path = path
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-y"]
+            + ["-f", "rawvideo", "-pix_fmt", "rgb0"]
+            + ["-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-"]
+            + FFMPEG_CODECS[codec]
+            + [path],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, surface):
+        # RGBX keeps the surface's 4-byte pixels, an order of magnitude
+        # faster to pull out than packed RGB
+        self.process.stdin.write(pygame.image.tobytes(surface, "RGBX"))
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait():
+            raise RuntimeError(f"ffmpeg failed writing {self.path}")
+
+
+class PNGWriter:
+    def __init__(self, path):
+        self.path = path
+        self.frames = 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, surface):
+        pygame.image.save(surface, os.path.join(self.path, f"{self.frames:06d}.png"))
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+def render_replay(path, out_dir, codec, fps):
+    # Runs in a worker. Returns (output path, frames).
+    from render import replay_frames
+    from replay import load
+
+    frames = replay_frames(*load(path), fps)
+    screen = next(frames)
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    if codec == "png":
+        output = os.path.join(out_dir, name)
+        writer = PNGWriter(output)
+    else:
+        output = os.path.join(out_dir, f"{name}.{codec}")
+        writer = FFmpegWriter(output, screen.get_size(), fps, codec)
+
+    count = 0
+    try:
+        writer.write(screen)
+        count += 1
+        for screen in frames:
+            writer.write(screen)
+            count += 1
+        for _ in range(END_HOLD * fps):
+            writer.write(screen)
+            count += 1
+    finally:
+        writer.close()
+    return output, count